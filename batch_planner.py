@@ -0,0 +1,241 @@
+#batch_planner.py
+
+
+import base64
+import json
+import time
+
+import fast_path
+import instrumentation
+from itinerary_codec import ItineraryCodec
+from state_graph import StateGraph
+
+
+def plan_batch(sg, requests, group_by='auto'):
+    """
+    批量查询最短时间路径：去重后按起点（或终点）分组，每组只运行一次单源搜索。
+    :param sg: StateGraph 对象
+    :param requests: (起点站点索引, 终点站点索引) 列表
+    :param group_by: 'origin' 按起点分组；'destination' 按终点分组并在反向图上搜索；
+                     'auto' 选择分组数更少的方式
+    :return: 与 requests 一一对应的结果列表，每项为 (站点路径, 总时间, 总距离, 换乘次数)，不可达为 None
+    """
+    if group_by not in ('auto', 'origin', 'destination'):
+        raise ValueError(f"Unknown group_by '{group_by}'.")
+
+    unique = set(requests)
+    if group_by == 'auto':
+        origins = {start for start, _ in unique}
+        destinations = {end for _, end in unique}
+        group_by = 'origin' if len(origins) <= len(destinations) else 'destination'
+    reverse = group_by == 'destination'
+
+    groups = {}
+    for start, end in unique:
+        root, leaf = (end, start) if reverse else (start, end)
+        groups.setdefault(root, []).append(leaf)
+
+    answers = {}
+    for root, leaves in groups.items():
+        dist, parent = sg.shortest_path_tree(root, reverse=reverse)
+        for leaf in leaves:
+            key = (leaf, root) if reverse else (root, leaf)
+            answers[key] = sg.tree_path(dist, parent, leaf, reverse)
+
+    return [answers[request] for request in requests]
+
+
+def format_result(station_names, start_station, end_station, result, codec=None):
+    """
+    将单条查询结果整理为可写入 JSONL 的字典，时间和费用的计算方式与 fast_path 相同。
+    :param station_names: 站点索引到名称的列表
+    :param start_station: 起始站名称
+    :param end_station: 终点站名称
+    :param result: plan_batch 返回的单条结果
+    :param codec: 若指定 ItineraryCodec，路径改为 base64 编码的压缩行程，写入 "itinerary" 字段
+    :return: 结果字典
+    """
+    if result is None:
+        return {'start': start_station, 'end': end_station, 'path': None}
+    path, total_time, total_distance, transfer_count = result
+    waiting_time = (len(path) - 1) * 60  # 每站停1分钟
+    distance_km = total_distance / 1000
+    record = {'start': start_station, 'end': end_station}
+    if codec is None:
+        record['path'] = [station_names[i] for i in path]
+    else:
+        record['itinerary'] = base64.b64encode(codec.encode(path)).decode('ascii')
+    record.update({
+        'time': int((total_time + waiting_time) / 60),
+        'distance': round(distance_km, 2),
+        'fare': fast_path.calculate_fare(distance_km),
+        'transfers': transfer_count,
+    })
+    return record
+
+
+def run_batch(graph, station_index_map, input_file, output_file, group_by='auto', compact=False):
+    """
+    读取 OD 文件（每行 "起点站,终点站"），批量查询后按行写入 JSONL 结果文件。
+    无法识别的站点名写入 {"path": null, "error": ...}。
+    :param graph: 图对象
+    :param station_index_map: 站点名称到索引的映射
+    :param input_file: OD 文件路径
+    :param output_file: 输出 JSONL 文件路径
+    :param group_by: 分组方式，见 plan_batch
+    :param compact: 为 True 时用 itinerary_codec 压缩路径，见 format_result；
+                    此时首行写入 {"itinerary_fingerprint": 编码指纹}，供 read_batch 校验线路数据
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        pairs = [tuple(part.strip() for part in (line.split(',', 1) + [''])[:2]) for line in f if line.strip()]
+
+    valid = [(station_index_map[s], station_index_map[e]) for s, e in pairs
+             if s in station_index_map and e in station_index_map]
+    with instrumentation.phase('search'):
+        results = iter(plan_batch(StateGraph(graph), valid, group_by))
+    station_names = list(station_index_map.keys())
+    codec = ItineraryCodec(graph) if compact else None
+
+    with instrumentation.phase('render'), open(output_file, 'w', encoding='utf-8') as f:
+        if codec is not None:
+            f.write(json.dumps({'itinerary_fingerprint': codec.fingerprint.hex()}) + '\n')
+        for s, e in pairs:
+            if s in station_index_map and e in station_index_map:
+                record = format_result(station_names, s, e, next(results), codec)
+            else:
+                record = {'start': s, 'end': e, 'path': None, 'error': "站点不存在"}
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def read_batch(input_file, codec=None):
+    """
+    读取 run_batch 写出的 JSONL 结果文件。
+    压缩输出中的 itinerary 字段解码为站点索引列表，写入 "stations" 字段。
+    :param input_file: JSONL 结果文件路径
+    :param codec: 读取压缩输出时必须传入，且线路数据与写出时一致
+    :return: 结果字典列表，不含首行的指纹记录
+    :raises ValueError: 压缩输出未传入 codec，或线路数据与写出时不一致
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if not records or 'itinerary_fingerprint' not in records[0]:
+        return records
+
+    fingerprint = records.pop(0)['itinerary_fingerprint']
+    if codec is None:
+        raise ValueError(f"{input_file} contains compact itineraries, a codec is required.")
+    if fingerprint != codec.fingerprint.hex():
+        raise ValueError(f"{input_file} was written from different line data.")
+    for record in records:
+        if 'itinerary' in record:
+            record['stations'] = codec.stations(base64.b64decode(record['itinerary']))
+    return records
+
+
+def commute_od_log(station_num, size, seed=0):
+    """
+    生成模拟通勤 OD 记录：出发地集中在少数居住区站点，目的地集中在少数就业区站点，
+    并包含大量重复请求。
+    :param station_num: 站点数量
+    :param size: 记录条数
+    :param seed: 随机种子
+    :return: (起点站点索引, 终点站点索引) 列表
+    """
+    import random
+
+    rng = random.Random(seed)
+    stations = list(range(station_num))
+    homes = rng.sample(stations, max(1, station_num // 10))
+    works = rng.sample(stations, max(1, station_num // 20))
+    # 按 Zipf 分布给热门站点更高的权重
+    home_weights = [1 / (i + 1) for i in range(len(homes))]
+    work_weights = [1 / (i + 1) for i in range(len(works))]
+    log = []
+    for _ in range(size):
+        start = rng.choices(homes, home_weights)[0] if rng.random() < 0.8 else rng.choice(stations)
+        end = rng.choices(works, work_weights)[0] if rng.random() < 0.8 else rng.choice(stations)
+        if start != end:
+            log.append((start, end))
+    return log
+
+
+def benchmark(json_file='stations.json', size=5000, seed=0):
+    """
+    比较批量查询与逐对调用的耗时，并打印结果。
+    :param json_file: 站点数据文件
+    :param size: 模拟 OD 记录条数
+    :param seed: 随机种子
+    """
+    import json_loader
+    import graph_builder
+
+    stations = json_loader.json_to_stations(json_file)
+    graph, _ = graph_builder.stations_to_graph(stations)
+    sg = StateGraph(graph)
+    log = commute_od_log(graph.vertex_num(), size, seed)
+    print(f"OD 记录 {len(log)} 条，去重后 {len(set(log))} 对，"
+          f"起点 {len({s for s, _ in log})} 个，终点 {len({e for _, e in log})} 个")
+
+    for group_by in ('origin', 'destination', 'auto'):
+        t0 = time.perf_counter()
+        batch = plan_batch(sg, log, group_by)
+        print(f"批量查询（{group_by}）：{time.perf_counter() - t0:.2f} 秒")
+
+    t0 = time.perf_counter()
+    naive = [sg.tree_path(*sg.shortest_path_tree(s), e) for s, e in log]
+    print(f"逐对单源搜索：{time.perf_counter() - t0:.2f} 秒")
+    assert all(abs(a[1] - b[1]) < 1e-6 for a, b in zip(batch, naive) if a and b)
+
+    sample = log[:100]
+    t0 = time.perf_counter()
+    for s, e in sample:
+        fast_path.dijkstra_top_k_paths(graph, s, e, k=1)
+    per_pair = (time.perf_counter() - t0) / len(sample)
+    print(f"逐对 dijkstra_top_k_paths(k=1)：约 {per_pair * len(log):.1f} 秒（按 {len(sample)} 条抽样估算）")
+
+
+def main():
+    """
+    命令行入口：python batch_planner.py 输入OD文件 输出JSONL文件 [--group-by auto|origin|destination]
+                [--metrics 指标文件] [--profile profile文件] [--compact]
+    或 python batch_planner.py --benchmark
+    """
+    import argparse
+    import json_loader
+    import graph_builder
+
+    parser = argparse.ArgumentParser(description="批量查询最短时间路径")
+    parser.add_argument('input', nargs='?', help="OD 文件，每行 \"起点站,终点站\"")
+    parser.add_argument('output', nargs='?', help="输出 JSONL 文件")
+    parser.add_argument('--json', default='stations.json', help="站点数据文件")
+    parser.add_argument('--group-by', default='auto', choices=['auto', 'origin', 'destination'], help="分组方式")
+    parser.add_argument('--metrics', help="开启统计并将指标写入该文件（Prometheus 文本格式）")
+    parser.add_argument('--profile', help="用 cProfile 捕获本次批量查询并保存到该文件")
+    parser.add_argument('--compact', action='store_true', help="路径以压缩行程编码输出（itinerary 字段）")
+    parser.add_argument('--benchmark', action='store_true', help="运行批量查询性能测试")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.json)
+        return
+    if args.input is None or args.output is None:
+        parser.error("需要指定输入 OD 文件和输出 JSONL 文件")
+
+    if args.metrics:
+        instrumentation.enable()
+    with instrumentation.phase('loading'):
+        stations = json_loader.json_to_stations(args.json)
+        graph, station_index_map = graph_builder.stations_to_graph(stations)
+
+    batch_args = (graph, station_index_map, args.input, args.output, args.group_by, args.compact)
+    if args.profile:
+        instrumentation.profile_query(run_batch, *batch_args, output_file=args.profile, limit=0)
+    else:
+        run_batch(*batch_args)
+
+    if args.metrics:
+        instrumentation.write_metrics(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#benchmark.py
+
+
+import contextlib
+import gc
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+import json_loader
+import graph_builder
+import fast_path
+import convenient_path
+import edit_path
+from state_graph import StateGraph
+from synthetic_network import scale_stations
+
+
+# OD 距离分类（按最短时间，单位：分钟）
+OD_CLASSES = (('short', 0, 15), ('medium', 15, 45), ('cross', 45, float('inf')))
+
+
+def _measure(func, repeat, min_time=0.02):
+    """
+    重复执行 func，返回单次耗时的中位数（秒）。
+    单次耗时很短时每个样本连续执行多次，使每个样本至少耗时 min_time；
+    与 timeit 相同，计时期间关闭垃圾回收，减小计时抖动。
+    """
+    gc.collect()
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _measure_samples(func, repeat, min_time)
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def _measure_samples(func, repeat, min_time):
+    """
+    _measure 的计时部分。
+    """
+    number = 1
+    while True:  # 确定每个样本的执行次数，同时起到预热作用
+        t0 = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - t0 >= min_time:
+            break
+        number *= 2
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - t0) / number)
+    return statistics.median(samples)
+
+
+def od_pairs(graph, per_class=5, seed=0):
+    """
+    用固定随机种子选取短途、中途和跨城三类 OD 对。
+    :param graph: 图对象
+    :param per_class: 每类选取的数量
+    :param seed: 随机种子
+    :return: {类别: [(起点站点索引, 终点站点索引), ...]}
+    """
+    rng = random.Random(seed)
+    sg = StateGraph(graph)
+    n = graph.vertex_num()
+    pairs = {name: [] for name, _, _ in OD_CLASSES}
+    for _ in range(200):
+        if all(len(v) >= per_class for v in pairs.values()):
+            break
+        origin = rng.randrange(n)
+        times, _ = sg.station_arrivals(origin)
+        candidates = list(range(n))
+        rng.shuffle(candidates)
+        for name, low, high in OD_CLASSES:
+            for end in candidates:
+                if len(pairs[name]) >= per_class:
+                    break
+                if end != origin and low * 60 <= times[end] < high * 60:
+                    pairs[name].append((origin, end))
+                    break
+    return pairs
+
+
+def run_benchmarks(json_file='stations.json', scales=(1,), repeat=5, seed=0):
+    """
+    运行全部性能测试。
+    :param json_file: 站点数据文件
+    :param scales: 网络规模倍数列表，大于 1 时使用 synthetic_network 生成合成网络
+    :param repeat: 每项测试的重复次数，取中位数
+    :param seed: 选取 OD 对和线路使用的随机种子
+    :return: ({指标名称: 耗时（秒）}, 因缺少可选依赖而跳过的指标名称列表)
+    """
+    metrics = {}
+    skipped = []
+    base = json_loader.json_to_stations(json_file)
+    metrics['x1.load'] = _measure(lambda: json_loader.json_to_stations(json_file), repeat)
+
+    try:
+        from fuzzy_search import fuzzy_search, get_all_lines
+    except ImportError:  # 未安装 fuzzywuzzy 时跳过模糊匹配测试
+        fuzzy_search = None
+
+    for scale in scales:
+        prefix = f"x{scale}."
+        stations = base if scale == 1 else scale_stations(base, scale, seed=seed)
+        metrics[prefix + 'build'] = _measure(lambda: graph_builder.stations_to_graph(stations), repeat)
+        graph, station_index_map = graph_builder.stations_to_graph(stations)
+        names = list(station_index_map.keys())
+        rng = random.Random(seed)
+
+        if fuzzy_search is not None:
+            queries = [name[:-1] or name for name in rng.sample(names, 5)]
+            metrics[prefix + 'fuzzy_station'] = _measure(
+                lambda: [fuzzy_search(q, names) for q in queries], repeat)
+            all_lines = get_all_lines(stations)
+            metrics[prefix + 'fuzzy_line'] = _measure(
+                lambda: [fuzzy_search(q, all_lines) for q in ('1号线', '10号线', '亦庄线')], repeat)
+        else:
+            skipped += [prefix + 'fuzzy_station', prefix + 'fuzzy_line']
+
+        for name, pairs in od_pairs(graph, seed=seed).items():
+            if not pairs:
+                continue
+            metrics[f"{prefix}fast_path.{name}"] = _measure(
+                lambda: [fast_path.dijkstra_top_k_paths(graph, s, e) for s, e in pairs], repeat)
+            metrics[f"{prefix}convenient_path.{name}"] = _measure(
+                lambda: [convenient_path.dijkstra_min_transfer_paths(graph, s, e) for s, e in pairs], repeat)
+
+        line_id = rng.choice(sorted({edge[3] for vi in range(graph.vertex_num()) for edge in graph.out_edges(vi)}))
+
+        def toggle():
+            edit_path.delete_path(graph, line_id)
+            edit_path.add_path(graph, line_id)
+        metrics[prefix + 'edit_path.toggle'] = _measure(toggle, repeat)
+
+        # 渲染耗时：预先算好路径传给 query_station_time，只计渲染部分，屏蔽输出
+        graph, _ = graph_builder.stations_to_graph(stations)
+        s, e = od_pairs(graph, per_class=1, seed=seed)['medium'][0]
+        paths = fast_path.dijkstra_top_k_paths(graph, s, e)
+
+        def render():
+            with contextlib.redirect_stdout(io.StringIO()):
+                fast_path.query_station_time(graph, station_index_map, names[s], names[e], paths=paths)
+        metrics[prefix + 'render'] = _measure(render, repeat)
+
+    return metrics, skipped
+
+
+def save_results(metrics, file_path, repeat, seed, skipped=()):
+    """
+    将测试结果连同运行环境信息和跳过的指标保存为 JSON 基准文件。
+    """
+    data = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'metrics': metrics,
+        'skipped': sorted(skipped),
+    }
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def load_results(file_path):
+    """
+    读取 JSON 基准文件中的指标。
+    :param file_path: 基准文件路径
+    :return: ({指标名称: 耗时（秒）}, 跳过的指标名称列表)
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data['metrics'], data.get('skipped', [])
+
+
+def baseline_scales(baseline):
+    """
+    从基准指标名称（如 "x10.build"）中取出基准覆盖的网络规模倍数。
+    :param baseline: 基准指标字典
+    :return: 规模倍数列表
+    """
+    return sorted({int(name.split('.', 1)[0][1:]) for name in baseline})
+
+
+def compare(baseline, current, threshold=0.25, min_delta=0.0001, skipped=()):
+    """
+    比较两组测试结果并打印每项指标的变化。
+    基准中有而当前结果中缺失的指标也算作退化，当前运行中因缺少可选依赖而主动跳过的除外。
+    :param baseline: 基准指标字典
+    :param current: 当前指标字典
+    :param threshold: 允许的最大变慢比例，如 0.25 表示 25%
+    :param min_delta: 变慢的绝对值不超过该值（秒）时不算退化，避免极短的指标因计时抖动误报
+    :param skipped: 当前运行中跳过的指标名称
+    :return: 退化的指标名称列表
+    """
+    regressions = []
+    for name in sorted(set(baseline) | set(current)):
+        old = baseline.get(name)
+        new = current.get(name)
+        if old is None:
+            print(f"{name}：新增")
+            continue
+        if new is None and name in skipped:
+            print(f"{name}：跳过（缺少可选依赖）")
+            continue
+        if new is None:
+            regressions.append(name)
+            print(f"{name}：缺失  <-- 性能退化")
+            continue
+        change = (new - old) / old if old else 0
+        flag = ''
+        if change > threshold and new - old > min_delta:
+            regressions.append(name)
+            flag = '  <-- 性能退化'
+        print(f"{name}：{old * 1000:.3f} -> {new * 1000:.3f} 毫秒（{change:+.1%}）{flag}")
+    return regressions
+
+
+def main():
+    """
+    命令行入口：
+    python benchmark.py run [--output 结果文件] [--scales 1 10] [--compare 基准文件]
+    python benchmark.py compare 基准文件 结果文件 [--threshold 0.25] [--min-delta 0.1]
+    存在超过阈值的性能退化（包括基准中的指标缺失）时以状态码 1 退出。
+    指定 --compare 而未指定 --scales 时，使用基准覆盖的全部规模。
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="北京地铁路线查询系统性能测试")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help="运行性能测试")
+    run.add_argument('--json', default='stations.json', help="站点数据文件")
+    run.add_argument('--scales', type=int, nargs='+', help="网络规模倍数，默认为 1 或 --compare 基准覆盖的规模")
+    run.add_argument('--repeat', type=int, default=5, help="每项测试的重复次数")
+    run.add_argument('--seed', type=int, default=0, help="随机种子")
+    run.add_argument('--output', help="将结果保存为 JSON 基准文件")
+    run.add_argument('--compare', help="与该基准文件比较")
+    run.add_argument('--threshold', type=float, default=0.25, help="允许的最大变慢比例")
+    run.add_argument('--min-delta', type=float, default=0.1, help="变慢不超过该毫秒数时不算退化")
+
+    cmp = sub.add_parser('compare', help="比较两个结果文件")
+    cmp.add_argument('baseline', help="基准文件")
+    cmp.add_argument('current', help="当前结果文件")
+    cmp.add_argument('--threshold', type=float, default=0.25, help="允许的最大变慢比例")
+    cmp.add_argument('--min-delta', type=float, default=0.1, help="变慢不超过该毫秒数时不算退化")
+
+    args = parser.parse_args()
+
+    min_delta = args.min_delta / 1000
+    if args.command == 'run':
+        baseline = load_results(args.compare)[0] if args.compare else None
+        scales = args.scales or (baseline_scales(baseline) if baseline else [1])
+        metrics, skipped = run_benchmarks(args.json, scales, args.repeat, args.seed)
+        if args.output:
+            save_results(metrics, args.output, args.repeat, args.seed, skipped)
+        if baseline:
+            regressions = compare(baseline, metrics, args.threshold, min_delta, skipped)
+        else:
+            for name, value in sorted(metrics.items()):
+                print(f"{name}：{value * 1000:.3f} 毫秒")
+            for name in skipped:
+                print(f"{name}：跳过（缺少可选依赖）")
+            regressions = []
+    else:
+        current, skipped = load_results(args.current)
+        regressions = compare(load_results(args.baseline)[0], current, args.threshold, min_delta, skipped)
+
+    if regressions:
+        print(f"\n{len(regressions)} 项指标退化超过 {args.threshold:.0%} 或缺失：{', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
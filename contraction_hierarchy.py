@@ -0,0 +1,375 @@
+#contraction_hierarchy.py
+
+
+import heapq
+import json
+import os
+import time
+
+import instrumentation
+from state_graph import StateGraph
+
+
+class ContractionHierarchy:
+    def __init__(self, state_graph=None):
+        """
+        在线路感知状态图上构建收缩层次（Contraction Hierarchy）索引。
+        :param state_graph: StateGraph 对象；为 None 时创建空索引（用于从文件加载）
+        """
+        self.states = []  # 状态索引 -> (站点索引, 线路ID)
+        self.station_states = []  # 站点索引 -> 该站所有状态
+        self.rank = []  # 状态的收缩顺序，越大越"重要"
+        # 向上图：up[u] = {w: (时间, 距离, 换乘次数, 中间状态)}，仅包含 rank[w] > rank[u] 的边
+        self.up = []
+        # 反向向上图：down[w] = {u: (...)}，表示原图中的边 u->w，且 rank[u] > rank[w]
+        self.down = []
+        if state_graph is not None:
+            self._build(state_graph)
+
+    def _build(self, sg, hop_limit=5, settle_limit=60):
+        """
+        按节点重要度依次收缩所有状态，创建必要的捷径边。
+        :param sg: StateGraph 对象
+        :param hop_limit: 见证搜索的最大跳数
+        :param settle_limit: 见证搜索最多结算的状态数
+        """
+        n = sg.state_num()
+        self.states = list(sg.states)
+        self.station_states = [list(states) for states in sg.station_states]
+
+        # 剩余图：out_e[u] = {w: (时间, 距离, 换乘次数, 中间状态)}，in_e 为其反向
+        out_e = [{} for _ in range(n)]
+        in_e = [{} for _ in range(n)]
+        for u in range(n):
+            for w, t, d, x in sg.adj[u]:
+                old = out_e[u].get(w)
+                if old is None or t < old[0]:
+                    out_e[u][w] = (t, d, x, None)
+                    in_e[w][u] = (t, d, x, None)
+
+        contracted = [False] * n
+        level = [0] * n  # 节点深度，用于均衡收缩顺序
+        deleted = [0] * n  # 已收缩的邻居数量
+        self.rank = [0] * n
+        self.up = [{} for _ in range(n)]
+        self.down = [{} for _ in range(n)]
+
+        def witness(u, v, targets, max_cost):
+            """
+            从 u 出发、绕开 v 的有界 Dijkstra 搜索，返回到各目标的最短时间。
+            """
+            dist = {u: 0}
+            pq = [(0, 0, u)]
+            settled = 0
+            remaining = len(targets)
+            while pq and remaining and settled < settle_limit:
+                c, hops, x = heapq.heappop(pq)
+                if c > dist.get(x, float('inf')):
+                    continue
+                if c > max_cost:
+                    break
+                settled += 1
+                if x in targets:
+                    remaining -= 1
+                if hops >= hop_limit:
+                    continue
+                for y, (t, _, _, _) in out_e[x].items():
+                    if y == v or contracted[y]:
+                        continue
+                    nc = c + t
+                    if nc < dist.get(y, float('inf')):
+                        dist[y] = nc
+                        heapq.heappush(pq, (nc, hops + 1, y))
+            return dist
+
+        def shortcuts(v):
+            """
+            计算收缩 v 时需要添加的捷径边列表。
+            """
+            result = []
+            ins = [(u, e) for u, e in in_e[v].items() if not contracted[u]]
+            outs = [(w, e) for w, e in out_e[v].items() if not contracted[w]]
+            if not ins or not outs:
+                return result
+            max_out = max(e[0] for _, e in outs)
+            for u, eu in ins:
+                targets = {w for w, _ in outs if w != u}
+                if not targets:
+                    continue
+                dist = witness(u, v, targets, eu[0] + max_out)
+                for w, ew in outs:
+                    if w == u:
+                        continue
+                    cost = eu[0] + ew[0]
+                    if dist.get(w, float('inf')) <= cost:
+                        continue  # 存在不经过 v 的见证路径
+                    # 捷径记录总时间（含换乘惩罚）、总距离和内部换乘次数
+                    result.append((u, w, (cost, eu[1] + ew[1], eu[2] + ew[2], v)))
+            return result
+
+        def priority(v):
+            """
+            节点重要度：边差 + 已收缩邻居数 + 层级。
+            """
+            sc = len(shortcuts(v))
+            degree = (sum(1 for u in in_e[v] if not contracted[u])
+                      + sum(1 for w in out_e[v] if not contracted[w]))
+            return sc - degree + deleted[v] + level[v]
+
+        pq = [(priority(v), v) for v in range(n)]
+        heapq.heapify(pq)
+        order = 0
+        while pq:
+            p, v = heapq.heappop(pq)
+            if contracted[v]:
+                continue
+            # 惰性更新：重新计算优先级，若不再是最小值则放回队列
+            new_p = priority(v)
+            if pq and new_p > pq[0][0]:
+                heapq.heappush(pq, (new_p, v))
+                continue
+
+            for u, w, edge in shortcuts(v):
+                old = out_e[u].get(w)
+                if old is None or edge[0] < old[0]:
+                    out_e[u][w] = edge
+                    in_e[w][u] = edge
+
+            # 将 v 的边分入向上图，此时 v 的剩余邻居都比 v 晚收缩
+            for w, e in out_e[v].items():
+                if not contracted[w]:
+                    self.up[v][w] = e
+            for u, e in in_e[v].items():
+                if not contracted[u]:
+                    self.down[v][u] = e
+
+            contracted[v] = True
+            self.rank[v] = order
+            order += 1
+            for x in list(in_e[v]) + list(out_e[v]):
+                if not contracted[x]:
+                    deleted[x] += 1
+                    level[x] = max(level[x], level[v] + 1)
+
+    def edge_num(self):
+        """
+        获取索引中向上图和反向向上图的边总数。
+        :return: 边数量
+        """
+        return sum(len(e) for e in self.up) + sum(len(e) for e in self.down)
+
+    def _edge(self, u, w):
+        """
+        获取索引中原图方向为 u->w 的边（可能是捷径）。
+        """
+        e = self.up[u].get(w)
+        if e is None:
+            e = self.down[w].get(u)
+        return e
+
+    def _unpack(self, u, w, out):
+        """
+        递归展开捷径 u->w，将经过的状态（不含 u）追加到 out。
+        """
+        stack = [(u, w)]
+        while stack:
+            a, b = stack.pop()
+            middle = self._edge(a, b)[3]
+            if middle is None:
+                out.append(b)
+            else:
+                stack.append((middle, b))
+                stack.append((a, middle))
+
+    def query(self, start, end):
+        """
+        双向向上搜索计算从起点站到终点站的最短时间路径。
+        :param start: 起始站点索引
+        :param end: 终点站点索引
+        :return: (站点路径, 总时间, 总距离, 换乘次数)，不可达时返回 None
+        """
+        if start == end:
+            return [start], 0, 0, 0
+        inf = float('inf')
+        dist = ({}, {})
+        parent = ({}, {})
+        pqs = ([], [])
+        for s in self.station_states[start]:
+            dist[0][s] = 0
+            parent[0][s] = None
+            pqs[0].append((0, s))
+        for s in self.station_states[end]:
+            dist[1][s] = 0
+            parent[1][s] = None
+            pqs[1].append((0, s))
+        graphs = (self.up, self.down)
+
+        best = inf
+        meet = None
+        heap_pop = settled = 0
+        while pqs[0] or pqs[1]:
+            # 两个方向的队首都不小于当前最优值时停止
+            top0 = pqs[0][0][0] if pqs[0] else inf
+            top1 = pqs[1][0][0] if pqs[1] else inf
+            if min(top0, top1) >= best:
+                break
+            side = 0 if top0 <= top1 else 1
+            c, x = heapq.heappop(pqs[side])
+            heap_pop += 1
+            if c > dist[side][x]:
+                continue
+            settled += 1
+            other = dist[1 - side].get(x)
+            if other is not None and c + other < best:
+                best = c + other
+                meet = x
+            for y, e in graphs[side][x].items():
+                nc = c + e[0]
+                if nc < dist[side].get(y, inf):
+                    dist[side][y] = nc
+                    parent[side][y] = x
+                    heapq.heappush(pqs[side], (nc, y))
+
+        if instrumentation.enabled:
+            instrumentation.record('contraction_hierarchy', heap_push=heap_pop + len(pqs[0]) + len(pqs[1]),
+                                   heap_pop=heap_pop, settled=settled)
+        if meet is None:
+            return None
+
+        # 拼接正向和反向搜索树，再逐段展开捷径
+        up_chain = []
+        x = meet
+        while x is not None:
+            up_chain.append(x)
+            x = parent[0][x]
+        up_chain.reverse()
+        x = parent[1][meet]
+        while x is not None:
+            up_chain.append(x)
+            x = parent[1][x]
+
+        state_path = [up_chain[0]]
+        total_time = total_distance = transfer_count = 0
+        for a, b in zip(up_chain, up_chain[1:]):
+            t, d, k, _ = self._edge(a, b)
+            total_time += t
+            total_distance += d
+            transfer_count += k
+            self._unpack(a, b, state_path)
+
+        path = []
+        for s in state_path:
+            station = self.states[s][0]
+            if not path or path[-1] != station:
+                path.append(station)
+        return path, total_time, total_distance, transfer_count
+
+    def save(self, file_path):
+        """
+        将预处理好的索引序列化为 JSON 文件。
+        :param file_path: 输出文件路径
+        """
+        edges = []
+        for u, row in enumerate(self.up):
+            for w, (t, d, k, m) in row.items():
+                edges.append([u, w, t, d, k, m])
+        for w, row in enumerate(self.down):
+            for u, (t, d, k, m) in row.items():
+                edges.append([u, w, t, d, k, m])
+        data = {
+            'station_num': len(self.station_states),
+            'states': [[station, line_id] for station, line_id in self.states],
+            'rank': self.rank,
+            'edges': edges,
+        }
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, file_path):
+        """
+        从 JSON 文件中加载预处理好的索引。
+        :param file_path: 索引文件路径
+        :return: ContractionHierarchy 对象
+        """
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        ch = cls()
+        ch.states = [(station, line_id) for station, line_id in data['states']]
+        ch.rank = data['rank']
+        ch.station_states = [[] for _ in range(data['station_num'])]
+        for s, (station, _) in enumerate(ch.states):
+            ch.station_states[station].append(s)
+        ch.up = [{} for _ in ch.states]
+        ch.down = [{} for _ in ch.states]
+        for u, w, t, d, k, m in data['edges']:
+            if ch.rank[w] > ch.rank[u]:
+                ch.up[u][w] = (t, d, k, m)
+            else:
+                ch.down[w][u] = (t, d, k, m)
+        return ch
+
+
+def build_hierarchy(graph):
+    """
+    对图对象进行收缩层次预处理。
+    :param graph: 图对象
+    :return: ContractionHierarchy 对象
+    """
+    return ContractionHierarchy(StateGraph(graph))
+
+
+def benchmark(json_file='stations.json', scales=(1, 10, 100), queries=200, seed=0):
+    """
+    测试不同规模网络上的预处理时间、索引大小和查询延迟，并打印结果。
+    :param json_file: 站点数据文件
+    :param scales: 网络规模倍数列表，大于 1 时使用 synthetic_network 生成合成网络
+    :param queries: 每个规模下随机查询的次数
+    :param seed: 随机种子
+    """
+    import random
+    import tempfile
+    import json_loader
+    import graph_builder
+    import fast_path
+    from synthetic_network import scale_stations
+
+    base = json_loader.json_to_stations(json_file)
+    rng = random.Random(seed)
+    for scale in scales:
+        stations = base if scale == 1 else scale_stations(base, scale, seed=seed)
+        graph, _ = graph_builder.stations_to_graph(stations)
+
+        t0 = time.perf_counter()
+        ch = build_hierarchy(graph)
+        build_time = time.perf_counter() - t0
+
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+            index_file = f.name
+        ch.save(index_file)
+        index_size = os.path.getsize(index_file)
+        os.remove(index_file)
+
+        n = graph.vertex_num()
+        pairs = [(rng.randrange(n), rng.randrange(n)) for _ in range(queries)]
+        t0 = time.perf_counter()
+        for s, e in pairs:
+            ch.query(s, e)
+        query_ms = (time.perf_counter() - t0) / queries * 1000
+
+        print(f"规模 x{scale}: 站点 {n}，状态 {len(ch.states)}，索引边 {ch.edge_num()}，"
+              f"预处理 {build_time:.2f} 秒，索引 {index_size / 1024:.1f} KB，"
+              f"平均查询 {query_ms:.3f} 毫秒")
+
+        if scale == 1:
+            # 与现有 Dijkstra 实现对比单次查询耗时
+            sample = pairs[:20]
+            t0 = time.perf_counter()
+            for s, e in sample:
+                fast_path.dijkstra_top_k_paths(graph, s, e, k=1)
+            dijkstra_ms = (time.perf_counter() - t0) / len(sample) * 1000
+            print(f"规模 x1: dijkstra_top_k_paths(k=1) 平均查询 {dijkstra_ms:.3f} 毫秒")
+
+
+if __name__ == "__main__":
+    benchmark()
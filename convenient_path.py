@@ -4,6 +4,8 @@
 import heapq
 import datetime
 
+import instrumentation
+
 
 def dijkstra_min_transfer_paths(graph, start, end, k=20, max_path_length=40):
     """
@@ -19,10 +21,12 @@ def dijkstra_min_transfer_paths(graph, start, end, k=20, max_path_length=40):
     paths = []
     pq = [(0, 0, 0, start, [])]  # 优先队列元素格式为 (换乘次数, 总时间, 总距离, 当前站点, 当前路径)
     visited = {}  # 记录已访问节点和对应路径的最少换乘次数
+    heap_pop = settled = 0  # 性能统计计数，入堆和 get_edge 次数在结束时推算
 
     while pq and len(paths) < k:
         # 取出优先队列中的元素，优先级是换乘次数最少的路径
         transfer_count, current_time, current_distance, current_node, current_path = heapq.heappop(pq)
+        heap_pop += 1
 
         # 如果当前路径超过了最大限制，则跳过
         if len(current_path) > max_path_length:
@@ -37,6 +41,7 @@ def dijkstra_min_transfer_paths(graph, start, end, k=20, max_path_length=40):
         if (current_node, len(current_path)) in visited and visited[(current_node, len(current_path))] <= transfer_count:
             continue
         visited[(current_node, len(current_path))] = transfer_count
+        settled += 1
 
         # 遍历当前节点的所有相邻节点
         for edge in graph.out_edges(current_node):
@@ -63,6 +68,13 @@ def dijkstra_min_transfer_paths(graph, start, end, k=20, max_path_length=40):
             # 将新路径信息加入优先队列
             heapq.heappush(pq, (new_transfer_count, new_time, new_distance, neighbor, new_path))
 
+    if instrumentation.enabled:
+        heap_push = heap_pop + len(pq)  # 包含初始元素，与其他搜索的计数口径一致
+        # 除初始元素和起点展开外，每次入堆前都调用一次 get_edge 判断换乘
+        start_pushes = 0 if start == end else sum(1 for edge in graph.out_edges(start) if edge[4])
+        instrumentation.record('convenient_path', heap_push=heap_push, heap_pop=heap_pop,
+                               settled=settled, get_edge=heap_push - 1 - start_pushes)
+
     # 按换乘次数排序，并返回前k个路径
     paths.sort(key=lambda x: x[3])
     return paths[:k]
@@ -127,7 +139,8 @@ def query_station_transfer(graph, station_index_map, start_station, end_station,
         return
 
     # 调用Dijkstra算法计算最少换乘的前k条路径
-    top_k_paths = dijkstra_min_transfer_paths(graph, start, end, k)
+    with instrumentation.phase('search'):
+        top_k_paths = dijkstra_min_transfer_paths(graph, start, end, k)
 
     if not top_k_paths:
         print(f"无法从 {start_station} 到 {end_station}。")
@@ -139,63 +152,64 @@ def query_station_transfer(graph, station_index_map, start_station, end_station,
     # 提取路径、总时间、总距离和换乘次数
     path, total_time, total_distance, transfer_count = best_path
 
-    # 计算停车等待时间，每站停1分钟，终点站不停车
-    waiting_time = (len(path) - 1) * 60  # 每站停1分钟
+    with instrumentation.phase('render'):
+        # 计算停车等待时间，每站停1分钟，终点站不停车
+        waiting_time = (len(path) - 1) * 60  # 每站停1分钟
 
-    # 计算最终时间，秒转换为分钟
-    final_time_minutes = int((total_time + waiting_time) / 60)
+        # 计算最终时间，秒转换为分钟
+        final_time_minutes = int((total_time + waiting_time) / 60)
 
-    # 获取当前时间
-    current_time = datetime.datetime.now().replace(second=0, microsecond=0)
+        # 获取当前时间
+        current_time = datetime.datetime.now().replace(second=0, microsecond=0)
 
-    # 计算预计到达时间
-    arrival_time = calculate_arrival_time(current_time, final_time_minutes)
+        # 计算预计到达时间
+        arrival_time = calculate_arrival_time(current_time, final_time_minutes)
 
-    # 输出路径信息
-    print(f"\n从 {start_station} 到 {end_station} 的最少换乘路径为：")
+        # 输出路径信息
+        print(f"\n从 {start_station} 到 {end_station} 的最少换乘路径为：")
 
-    # 获取起点到第二站的线路信息
-    start_line_id = None
-    if len(path) > 1:
-        second_node = path[1]
-        start_edge = graph.get_edge(start, second_node)
-        start_line_id = start_edge[3]  # 获取线路ID
+        # 获取起点到第二站的线路信息
+        start_line_id = None
+        if len(path) > 1:
+            second_node = path[1]
+            start_edge = graph.get_edge(start, second_node)
+            start_line_id = start_edge[3]  # 获取线路ID
 
-    # 打印起点的线路信息
-    if start_line_id is not None:
-        print(f"乘坐地铁 {start_line_id} ")
+        # 打印起点的线路信息
+        if start_line_id is not None:
+            print(f"乘坐地铁 {start_line_id} ")
 
-    last_line_id = start_line_id  # 用于记录上一条线路ID
+        last_line_id = start_line_id  # 用于记录上一条线路ID
 
-    # 输出路径站点信息
-    for i, idx in enumerate(path):
-        station_name = list(station_index_map.keys())[list(station_index_map.values()).index(idx)]
+        # 输出路径站点信息
+        for i, idx in enumerate(path):
+            station_name = list(station_index_map.keys())[list(station_index_map.values()).index(idx)]
 
-        if i > 0:
-            prev_node = path[i - 1]
-            current_edge = graph.get_edge(prev_node, idx)
-            current_line_id = current_edge[3]  # 当前线路ID
+            if i > 0:
+                prev_node = path[i - 1]
+                current_edge = graph.get_edge(prev_node, idx)
+                current_line_id = current_edge[3]  # 当前线路ID
 
-            if last_line_id and last_line_id != current_line_id:
-                print(f"\n换乘线路：{current_line_id}")
+                if last_line_id and last_line_id != current_line_id:
+                    print(f"\n换乘线路：{current_line_id}")
                 
-            last_line_id = current_line_id
-
-        # 打印站点名
-        if idx == path[-1]:
-            print(station_name)
-        else:
-            print(f"{station_name} \n↓")
-
-    # 计算总距离并转换为公里
-    total_distance_km = total_distance / 1000
-
-    # 计算乘车费用
-    fare = calculate_fare(total_distance_km)
-
-    # 输出总时间、总距离、费用和到达时间
-    print(f"\n总时间：{final_time_minutes} 分钟")
-    print(f"总距离：{total_distance_km:.2f} 公里")
-    print(f"乘车费用：{fare} 元")
-    print(f"当前时间：{current_time.strftime('%H:%M')}")
-    print(f"预计到达时间：{arrival_time.strftime('%H:%M')}")
+                last_line_id = current_line_id
+
+            # 打印站点名
+            if idx == path[-1]:
+                print(station_name)
+            else:
+                print(f"{station_name} \n↓")
+
+        # 计算总距离并转换为公里
+        total_distance_km = total_distance / 1000
+
+        # 计算乘车费用
+        fare = calculate_fare(total_distance_km)
+
+        # 输出总时间、总距离、费用和到达时间
+        print(f"\n总时间：{final_time_minutes} 分钟")
+        print(f"总距离：{total_distance_km:.2f} 公里")
+        print(f"乘车费用：{fare} 元")
+        print(f"当前时间：{current_time.strftime('%H:%M')}")
+        print(f"预计到达时间：{arrival_time.strftime('%H:%M')}")
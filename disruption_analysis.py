@@ -0,0 +1,226 @@
+#disruption_analysis.py
+
+
+import heapq
+import multiprocessing
+import os
+import time
+from array import array
+
+from state_graph import StateGraph
+
+
+# 子进程共享的只读数据，由 _init_worker 设置；fork 方式下与父进程写时复制共享
+_base = None
+_base_times = None
+_base_transfers = None
+
+
+def all_pairs(sg, active, blocked=frozenset()):
+    """
+    计算所有站点对之间的最短时间及该路径上的换乘次数。
+    :param sg: StateGraph 对象
+    :param active: 状态是否可用的 bytearray
+    :param blocked: 被封闭的状态边集合，元素为 (起点状态, 终点状态)
+    :return: (times, transfers)，均为长度 n*n 的 array，下标为 起点*n+终点，不可达时间为 inf
+    """
+    times = array('d')
+    transfers = array('h')
+    for origin in range(sg.station_num):
+        t, k = sg.station_arrivals(origin, active, blocked)
+        times.extend(t)
+        transfers.extend(k)
+    return times, transfers
+
+
+def scenarios(sg, kind):
+    """
+    枚举某一类停运场景。
+    :param sg: StateGraph 对象
+    :param kind: 'line'（整条线路）、'station'（单个站点）或 'segment'（相邻两站之间的区间，双向封闭）
+    :return: 场景列表，每个场景为 (名称, 停用状态列表, 封闭状态边列表, 不参与统计的站点列表)
+    """
+    result = []
+    if kind == 'line':
+        line_states = {}
+        for s, (_, line_id) in enumerate(sg.states):
+            line_states.setdefault(line_id, []).append(s)
+        for line_id in sorted(line_states):
+            result.append((line_id, line_states[line_id], [], []))
+    elif kind == 'station':
+        for station in range(sg.station_num):
+            if sg.station_states[station]:
+                result.append((station, sg.station_states[station], [], [station]))
+    elif kind == 'segment':
+        for su in range(sg.state_num()):
+            a, line_id = sg.states[su]
+            for sv, _, _, transfers in sg.adj[su]:
+                b = sg.states[sv][0]
+                if transfers == 0 and a < b:
+                    result.append(((a, b, line_id), [], [(su, sv), (sv, su)], []))
+    else:
+        raise ValueError(f"Unknown scenario kind '{kind}'.")
+    return result
+
+
+def _init_worker(base, base_times, base_transfers):
+    """
+    子进程初始化：保存共享的基础图和基准矩阵。
+    """
+    global _base, _base_times, _base_transfers
+    _base = base
+    _base_times = base_times
+    _base_transfers = base_transfers
+
+
+def _run_scenario(scenario, top=10):
+    """
+    计算单个停运场景相对基准的变化。
+    :param scenario: (名称, 停用状态列表, 封闭状态边列表, 不参与统计的站点列表)
+    :param top: 保留受影响最严重的站点对数量
+    :return: 场景统计结果字典
+    """
+    name, closed_states, closed_arcs, excluded = scenario
+    sg = _base
+    n = sg.station_num
+    inf = float('inf')
+
+    # 每个场景只复制一份掩码，基础图本身不被修改
+    active = bytearray(b'\x01') * sg.state_num()
+    for s in closed_states:
+        active[s] = 0
+
+    times, transfers = all_pairs(sg, active, frozenset(closed_arcs))
+
+    affected = 0
+    disconnected = 0
+    delay_sum = 0
+    delay_max = 0
+    extra_transfers = 0
+    worst = []
+    for o in range(n):
+        if o in excluded:
+            continue
+        for d in range(n):
+            if o == d or d in excluded:
+                continue
+            idx = o * n + d
+            old = _base_times[idx]
+            if old == inf:
+                continue
+            new = times[idx]
+            if new == inf:
+                disconnected += 1
+                continue
+            delay = new - old
+            if delay > 1e-6:
+                affected += 1
+                delay_sum += delay
+                delay_max = max(delay_max, delay)
+                if len(worst) < top:
+                    heapq.heappush(worst, (delay, o, d))
+                elif delay > worst[0][0]:
+                    heapq.heapreplace(worst, (delay, o, d))
+            extra_transfers += transfers[idx] - _base_transfers[idx]
+
+    return {
+        'name': name,
+        'affected': affected,
+        'disconnected': disconnected,
+        'mean_delay': delay_sum / affected if affected else 0,
+        'max_delay': delay_max,
+        'extra_transfers': extra_transfers,
+        'worst': sorted(worst, reverse=True),
+    }
+
+
+def analyze(graph, kind='line', workers=None, top=10):
+    """
+    在进程池中并行计算所有停运场景对全网出行时间和换乘次数的影响。
+    图对象应为 stations_to_graph 新生成的完整图。
+    :param graph: 图对象
+    :param kind: 场景类型，见 scenarios
+    :param workers: 进程数，默认使用全部 CPU 核心
+    :param top: 每个场景保留受影响最严重的站点对数量
+    :return: 按不可达站点对数量、总延误降序排列的场景统计结果列表
+    """
+    sg = StateGraph(graph, include_inactive=True)
+    base_times, base_transfers = all_pairs(sg, bytearray(b'\x01') * sg.state_num())
+    jobs = scenarios(sg, kind)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        _init_worker(sg, base_times, base_transfers)
+        results = [_run_scenario(job, top) for job in jobs]
+    else:
+        with multiprocessing.Pool(workers, _init_worker, (sg, base_times, base_transfers)) as pool:
+            results = pool.starmap(_run_scenario, [(job, top) for job in jobs])
+
+    results.sort(key=lambda r: (r['disconnected'], r['mean_delay'] * r['affected']), reverse=True)
+    return results
+
+
+def print_report(results, station_names, top=10):
+    """
+    打印停运影响分析的汇总结果和受影响最严重的站点对。
+    :param results: analyze 返回的结果列表
+    :param station_names: 站点索引到名称的列表
+    :param top: 输出受影响最严重的站点对数量
+    """
+    def label(name):
+        if isinstance(name, int):
+            return station_names[name]
+        if isinstance(name, tuple):
+            return f"{station_names[name[0]]}-{station_names[name[1]]}（{name[2]}）"
+        return name
+
+    print("\n停运场景影响汇总（按影响程度排序）：")
+    for r in results:
+        print(f"{label(r['name'])}：受影响站点对 {r['affected']}，不可达站点对 {r['disconnected']}，"
+              f"平均延误 {r['mean_delay'] / 60:.1f} 分钟，最大延误 {r['max_delay'] / 60:.1f} 分钟，"
+              f"新增换乘 {r['extra_transfers']} 次")
+
+    worst = sorted(((delay, o, d, r['name']) for r in results for delay, o, d in r['worst']),
+                   key=lambda x: x[0], reverse=True)[:top]
+    print(f"\n受影响最严重的 {len(worst)} 个站点对：")
+    for delay, o, d, name in worst:
+        print(f"{station_names[o]} -> {station_names[d]}：延误 {delay / 60:.1f} 分钟（{label(name)}）")
+
+
+def main():
+    """
+    命令行入口：python disruption_analysis.py [--kind line|station|segment] [--workers N] [--top K] [--scaling]
+    """
+    import argparse
+    import json_loader
+    import graph_builder
+
+    parser = argparse.ArgumentParser(description="地铁停运影响分析")
+    parser.add_argument('--json', default='stations.json', help="站点数据文件")
+    parser.add_argument('--kind', default='line', choices=['line', 'station', 'segment'], help="停运场景类型")
+    parser.add_argument('--workers', type=int, default=None, help="进程数，默认使用全部 CPU 核心")
+    parser.add_argument('--top', type=int, default=10, help="输出受影响最严重的站点对数量")
+    parser.add_argument('--scaling', action='store_true', help="依次使用 1 到全部核心运行并报告耗时")
+    args = parser.parse_args()
+
+    stations = json_loader.json_to_stations(args.json)
+    graph, station_index_map = graph_builder.stations_to_graph(stations)
+    station_names = list(station_index_map.keys())
+
+    if args.scaling:
+        cores = os.cpu_count() or 1
+        counts = sorted({1, *(c for c in (2, 4, 8, 16, 32, 64) if c <= cores), cores})
+        for workers in counts:
+            t0 = time.perf_counter()
+            analyze(graph, args.kind, workers, args.top)
+            print(f"{workers} 个进程：耗时 {time.perf_counter() - t0:.2f} 秒")
+        return
+
+    t0 = time.perf_counter()
+    results = analyze(graph, args.kind, args.workers, args.top)
+    print_report(results, station_names, args.top)
+    print(f"\n分析耗时 {time.perf_counter() - t0:.2f} 秒")
+
+
+if __name__ == "__main__":
+    main()
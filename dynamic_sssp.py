@@ -0,0 +1,282 @@
+#dynamic_sssp.py
+
+
+import heapq
+import time
+from collections import OrderedDict
+
+from state_graph import StateGraph
+
+
+class ShortestPathTree:
+    def __init__(self, dist, parent):
+        """
+        单个起点的最短时间树。
+        :param dist: 各状态的最短时间
+        :param parent: 各状态在树上的父状态
+        """
+        self.dist = dist
+        self.parent = parent
+        self.children = [set() for _ in parent]
+        for v, u in enumerate(parent):
+            if u is not None:
+                self.children[u].add(v)
+
+    def set_parent(self, v, u):
+        """
+        修改状态 v 的父状态，同时维护子状态集合。
+        """
+        old = self.parent[v]
+        if old is not None:
+            self.children[old].discard(v)
+        self.parent[v] = u
+        if u is not None:
+            self.children[u].add(v)
+
+
+class DynamicShortestPaths:
+    def __init__(self, graph, capacity=32):
+        """
+        缓存热门起点的最短时间树，并在线路关闭或恢复时增量修复。
+        图对象应为 stations_to_graph 新生成的完整图；线路的启停通过 delete_line / add_line
+        或 sync 告知本对象，closed_lines 和 active 始终与最近一次告知的停用线路集合一致。
+        与 GraphVersions 配合使用时由其在发布新版本时调用 sync。
+        :param graph: 图对象
+        :param capacity: 最多缓存的起点数量，超出时淘汰最久未使用的起点
+        """
+        self.sg = StateGraph(graph, include_inactive=True)
+        self.capacity = capacity
+        self.active = [True] * self.sg.state_num()
+        self.closed_lines = set()  # 包括图中不存在的线路名称，与调用方的集合保持一致
+        self.line_states = {}  # 线路ID -> 该线路的所有状态
+        for s, (_, line_id) in enumerate(self.sg.states):
+            self.line_states.setdefault(line_id, []).append(s)
+        self._trees = OrderedDict()  # 起点站点索引 -> ShortestPathTree
+
+    def tree(self, origin):
+        """
+        获取起点的最短时间树，未缓存时计算并加入缓存。
+        :param origin: 起始站点索引
+        :return: ShortestPathTree 对象
+        """
+        tree = self.cached(origin)
+        if tree is None:
+            tree = self.build(origin)
+            self.insert(origin, tree)
+        return tree
+
+    def cached(self, origin):
+        """
+        获取已缓存的最短时间树，未缓存时返回 None。
+        """
+        tree = self._trees.get(origin)
+        if tree is not None:
+            self._trees.move_to_end(origin)
+        return tree
+
+    def build(self, origin, active=None):
+        """
+        计算最短时间树但不加入缓存；只读取状态图，可以在其他线程修复缓存时调用。
+        :param origin: 起始站点索引
+        :param active: 状态是否可用的列表，默认使用当前的 active
+        :return: ShortestPathTree 对象
+        """
+        return ShortestPathTree(*self.sg.shortest_path_tree(origin, self.active if active is None else active))
+
+    def insert(self, origin, tree):
+        """
+        将最短时间树加入缓存，超出容量时淘汰最久未使用的起点。
+        树必须是在当前停用线路集合下计算的。
+        """
+        self._trees[origin] = tree
+        self._trees.move_to_end(origin)
+        if len(self._trees) > self.capacity:
+            self._trees.popitem(last=False)
+
+    def active_mask(self, closed_lines):
+        """
+        计算给定停用线路集合下各状态是否可用。
+        :param closed_lines: 停用线路ID集合
+        :return: 列表
+        """
+        active = [True] * self.sg.state_num()
+        for line_id in closed_lines:
+            for s in self.line_states.get(line_id, ()):
+                active[s] = False
+        return active
+
+    def sync(self, closed_lines):
+        """
+        将停用线路集合同步为 closed_lines，逐条关闭或恢复有变化的线路并修复缓存树。
+        :param closed_lines: 新的停用线路ID集合
+        """
+        for line_id in self.closed_lines - set(closed_lines):
+            self.add_line(line_id)
+        for line_id in set(closed_lines) - self.closed_lines:
+            self.delete_line(line_id)
+
+    def query(self, start, end):
+        """
+        查询从起点站到终点站的最短时间路径。
+        :param start: 起始站点索引
+        :param end: 终点站点索引
+        :return: (站点路径, 总时间, 总距离, 换乘次数)，不可达时返回 None
+        """
+        tree = self.tree(start)
+        return self.sg.tree_path(tree.dist, tree.parent, end)
+
+    def delete_line(self, line_id):
+        """
+        关闭线路：停用该线路的所有状态，并修复各缓存树中受影响的子树。
+        :param line_id: 要关闭的线路ID
+        """
+        if line_id in self.closed_lines:
+            return
+        self.closed_lines.add(line_id)
+        if line_id not in self.line_states:
+            return
+        removed = self.line_states[line_id]
+        for s in removed:
+            self.active[s] = False
+        for tree in self._trees.values():
+            self._repair_delete(tree, removed)
+
+    def add_line(self, line_id):
+        """
+        恢复线路：重新启用该线路的所有状态，并从这些状态出发更新各缓存树。
+        :param line_id: 要恢复的线路ID
+        """
+        if line_id not in self.closed_lines:
+            return
+        self.closed_lines.discard(line_id)
+        if line_id not in self.line_states:
+            return
+        restored = self.line_states[line_id]
+        for s in restored:
+            self.active[s] = True
+        for origin, tree in self._trees.items():
+            self._repair_insert(tree, origin, restored)
+
+    def _repair_delete(self, tree, removed):
+        """
+        删除状态后的修复（Ramalingam-Reps）：只重算被删除状态在树上的后代。
+        """
+        inf = float('inf')
+        # 找出所有最短路径经过被删除状态的后代
+        affected = []
+        stack = [s for s in removed if tree.dist[s] != inf]
+        seen = set(stack)
+        while stack:
+            x = stack.pop()
+            affected.append(x)
+            for y in tree.children[x]:
+                if y not in seen:
+                    seen.add(y)
+                    stack.append(y)
+        for x in affected:
+            tree.dist[x] = inf
+            tree.set_parent(x, None)
+
+        # 用未受影响的可用入邻居为受影响状态重新设定初值
+        sg = self.sg
+        pq = []
+        for x in affected:
+            if not self.active[x]:
+                continue
+            for u, t, _, _ in sg.radj[x]:
+                if self.active[u] and tree.dist[u] + t < tree.dist[x]:
+                    tree.dist[x] = tree.dist[u] + t
+                    tree.set_parent(x, u)
+            if tree.dist[x] != inf:
+                pq.append((tree.dist[x], x))
+        heapq.heapify(pq)
+        self._propagate(tree, pq)
+
+    def _repair_insert(self, tree, origin, restored):
+        """
+        恢复状态后的修复：从恢复的状态出发，只传播距离变小的部分。
+        """
+        sg = self.sg
+        pq = []
+        for x in restored:
+            if sg.states[x][0] == origin:
+                tree.dist[x] = 0
+                tree.set_parent(x, None)
+                pq.append((0, x))
+                continue
+            for u, t, _, _ in sg.radj[x]:
+                if self.active[u] and tree.dist[u] + t < tree.dist[x]:
+                    tree.dist[x] = tree.dist[u] + t
+                    tree.set_parent(x, u)
+            if tree.dist[x] != float('inf'):
+                pq.append((tree.dist[x], x))
+        heapq.heapify(pq)
+        self._propagate(tree, pq)
+
+    def _propagate(self, tree, pq):
+        """
+        以优先队列中的状态为起点继续 Dijkstra 松弛，直到没有距离变小的状态。
+        """
+        adj = self.sg.adj
+        active = self.active
+        dist = tree.dist
+        while pq:
+            c, x = heapq.heappop(pq)
+            if c > dist[x]:
+                continue
+            for y, t, _, _ in adj[x]:
+                if not active[y]:
+                    continue
+                nc = c + t
+                if nc < dist[y]:
+                    dist[y] = nc
+                    tree.set_parent(y, x)
+                    heapq.heappush(pq, (nc, y))
+
+
+def benchmark(json_file='stations.json', origins=32, seed=0):
+    """
+    逐条关闭每条线路，比较增量修复与全部重算缓存树的耗时，并打印结果。
+    :param json_file: 站点数据文件
+    :param origins: 缓存的热门起点数量
+    :param seed: 随机种子
+    """
+    import random
+    import json_loader
+    import graph_builder
+
+    stations = json_loader.json_to_stations(json_file)
+    graph, _ = graph_builder.stations_to_graph(stations)
+    rng = random.Random(seed)
+    hot = rng.sample(range(graph.vertex_num()), origins)
+
+    dsp = DynamicShortestPaths(graph, capacity=origins)
+    for origin in hot:
+        dsp.tree(origin)
+
+    total_repair = total_full = 0
+    for line_id in sorted(dsp.line_states):
+        t0 = time.perf_counter()
+        dsp.delete_line(line_id)
+        repair_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        full = {origin: dsp.sg.shortest_path_tree(origin, dsp.active)[0] for origin in hot}
+        full_time = time.perf_counter() - t0
+
+        for origin in hot:
+            assert all(abs(a - b) < 1e-6 or a == b for a, b in zip(dsp.tree(origin).dist, full[origin]))
+
+        t0 = time.perf_counter()
+        dsp.add_line(line_id)
+        restore_time = time.perf_counter() - t0
+
+        total_repair += repair_time + restore_time
+        total_full += 2 * full_time
+        print(f"{line_id}: 增量关闭 {repair_time * 1000:.2f} 毫秒，恢复 {restore_time * 1000:.2f} 毫秒，"
+              f"全部重算 {full_time * 1000:.2f} 毫秒")
+    print(f"合计：增量修复 {total_repair * 1000:.1f} 毫秒，全部重算 {total_full * 1000:.1f} 毫秒")
+
+
+if __name__ == "__main__":
+    benchmark()
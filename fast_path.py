@@ -4,6 +4,8 @@
 import heapq
 import datetime
 
+import instrumentation
+
 
 def dijkstra_top_k_paths(graph, start, end, k=20, max_path_length=40):
     """
@@ -19,9 +21,11 @@ def dijkstra_top_k_paths(graph, start, end, k=20, max_path_length=40):
     paths = []  # 存储找到的路径
     pq = [(0, 0, 0, start, [])]  # (总时间, 换乘次数, 总距离, 当前站点, 当前路径)
     visited = {}  # 记录访问过的节点和路径的最佳时间
+    heap_pop = settled = 0  # 性能统计计数，入堆和 get_edge 次数在结束时推算
 
     while pq and len(paths) < k:
         current_time, transfer_count, current_distance, current_node, current_path = heapq.heappop(pq)
+        heap_pop += 1
         
         # 如果当前路径长度超过限制，则跳过
         if len(current_path) > max_path_length:
@@ -36,6 +40,7 @@ def dijkstra_top_k_paths(graph, start, end, k=20, max_path_length=40):
         if (current_node, len(current_path)) in visited and visited[(current_node, len(current_path))] <= current_time:
             continue
         visited[(current_node, len(current_path))] = current_time
+        settled += 1
         
         # 遍历当前节点的所有相邻节点
         for edge in graph.out_edges(current_node):
@@ -61,6 +66,13 @@ def dijkstra_top_k_paths(graph, start, end, k=20, max_path_length=40):
             # 计算新的总时间时，包括每个站点的停靠时间（每站1分钟）
             heapq.heappush(pq, (new_time, new_transfer_count, new_distance, neighbor, new_path))
     
+    if instrumentation.enabled:
+        heap_push = heap_pop + len(pq)  # 包含初始元素，与其他搜索的计数口径一致
+        # 除初始元素和起点展开外，每次入堆前都调用一次 get_edge 判断换乘
+        start_pushes = 0 if start == end else sum(1 for edge in graph.out_edges(start) if edge[4])
+        instrumentation.record('fast_path', heap_push=heap_push, heap_pop=heap_pop,
+                               settled=settled, get_edge=heap_push - 1 - start_pushes)
+
     # 按时间排序并返回前k个结果
     paths.sort(key=lambda x: x[1])
     return paths[:k]
@@ -95,7 +107,7 @@ def calculate_arrival_time(start_time, total_time_minutes):
     arrival_time = start_time + datetime.timedelta(minutes=total_time_minutes)
     return arrival_time
 
-def query_station_time(graph, station_index_map, start_station, end_station, k=20):
+def query_station_time(graph, station_index_map, start_station, end_station, k=20, paths=None):
     """
     查询从起点站到终点站的最短时间路径，包含换乘时间和到达时间。
     :param graph: 图对象
@@ -103,6 +115,7 @@ def query_station_time(graph, station_index_map, start_station, end_station, k=2
     :param start_station: 起始站名称
     :param end_station: 终点站名称
     :param k: 需要找到的路径数量
+    :param paths: 已经算好的候选路径列表（如缓存的最短时间树给出的结果），为 None 时调用 dijkstra_top_k_paths
     """
     # 获取起点和终点的索引
     start = station_index_map.get(start_station)
@@ -113,7 +126,11 @@ def query_station_time(graph, station_index_map, start_station, end_station, k=2
         return
 
     # 调用Dijkstra算法计算最短时间的前k条路径
-    top_k_paths = dijkstra_top_k_paths(graph, start, end, k)
+    if paths is not None:
+        top_k_paths = paths
+    else:
+        with instrumentation.phase('search'):
+            top_k_paths = dijkstra_top_k_paths(graph, start, end, k)
 
     if not top_k_paths:
         print(f"无法从 {start_station} 到 {end_station}。")
@@ -125,65 +142,66 @@ def query_station_time(graph, station_index_map, start_station, end_station, k=2
     # 提取路径、总时间、总距离和换乘次数
     path, total_time, total_distance, transfer_count = best_path
 
-    # 计算停车等待时间，每站停1分钟，终点站不停车
-    waiting_time = (len(path) - 1) * 60  # 每站停1分钟，60秒
+    with instrumentation.phase('render'):
+        # 计算停车等待时间，每站停1分钟，终点站不停车
+        waiting_time = (len(path) - 1) * 60  # 每站停1分钟，60秒
 
-    # 计算最终时间（秒 -> 分钟），并将其转换为整数
-    final_time_minutes = int((total_time + waiting_time) / 60)
+        # 计算最终时间（秒 -> 分钟），并将其转换为整数
+        final_time_minutes = int((total_time + waiting_time) / 60)
 
-    # 获取当前时间
-    current_time = datetime.datetime.now().replace(second=0, microsecond=0)
+        # 获取当前时间
+        current_time = datetime.datetime.now().replace(second=0, microsecond=0)
 
-    # 计算预计到达时间
-    arrival_time = calculate_arrival_time(current_time, final_time_minutes)
+        # 计算预计到达时间
+        arrival_time = calculate_arrival_time(current_time, final_time_minutes)
 
-    # 输出路径和总时间
-    print("\n从 {} 到 {} 的最短时间路径为：".format(start_station, end_station))
+        # 输出路径和总时间
+        print("\n从 {} 到 {} 的最短时间路径为：".format(start_station, end_station))
 
-    # 获取起点与第二站之间的边
-    start_line_id = None
-    if len(path) > 1:
-        second_node = path[1]
-        start_edge = graph.get_edge(start, second_node)
-        start_line_id = start_edge[3]  # 获取起点到第二站的线路 ID
+        # 获取起点与第二站之间的边
+        start_line_id = None
+        if len(path) > 1:
+            second_node = path[1]
+            start_edge = graph.get_edge(start, second_node)
+            start_line_id = start_edge[3]  # 获取起点到第二站的线路 ID
 
-    # 打印起点线路信息
-    if start_line_id is not None:
-        print(f"乘坐地铁 {start_line_id} ")
+        # 打印起点线路信息
+        if start_line_id is not None:
+            print(f"乘坐地铁 {start_line_id} ")
 
-    # 用于跟踪上一条边的线路 ID
-    last_line_id = start_line_id
+        # 用于跟踪上一条边的线路 ID
+        last_line_id = start_line_id
 
-    for i, idx in enumerate(path):
-        station_name = list(station_index_map.keys())[list(station_index_map.values()).index(idx)]
+        for i, idx in enumerate(path):
+            station_name = list(station_index_map.keys())[list(station_index_map.values()).index(idx)]
 
-        # 如果不是第一个站点，检查是否需要换乘
-        if i > 0:
-            prev_node = path[i - 1]
-            current_edge = graph.get_edge(prev_node, idx)
-            current_line_id = current_edge[3]  # 当前边的线路 ID
+            # 如果不是第一个站点，检查是否需要换乘
+            if i > 0:
+                prev_node = path[i - 1]
+                current_edge = graph.get_edge(prev_node, idx)
+                current_line_id = current_edge[3]  # 当前边的线路 ID
             
-            if last_line_id and last_line_id != current_line_id:
-                print("\n换乘线路：{}".format(current_line_id))
+                if last_line_id and last_line_id != current_line_id:
+                    print("\n换乘线路：{}".format(current_line_id))
                 
-            last_line_id = current_line_id
+                last_line_id = current_line_id
 
-        # 打印站点名
-        if idx == path[-1]:  # 如果是最后一个站点
-            print(station_name)
-        else:
-            print(f"{station_name} \n↓")
+            # 打印站点名
+            if idx == path[-1]:  # 如果是最后一个站点
+                print(station_name)
+            else:
+                print(f"{station_name} \n↓")
 
-    # 将总距离从米转换为公里
-    total_distance_km = total_distance / 1000
+        # 将总距离从米转换为公里
+        total_distance_km = total_distance / 1000
 
-    # 计算乘车费用
-    fare = calculate_fare(total_distance_km)
+        # 计算乘车费用
+        fare = calculate_fare(total_distance_km)
 
-    print(f"\n总时间：{final_time_minutes} 分钟")
-    print(f"总距离：{total_distance_km:.2f} 公里")
-    print(f"乘车费用：{fare} 元")
+        print(f"\n总时间：{final_time_minutes} 分钟")
+        print(f"总距离：{total_distance_km:.2f} 公里")
+        print(f"乘车费用：{fare} 元")
 
-    # 输出当前时间和预计到达时间，精确到分钟
-    print(f"当前时间：{current_time.strftime('%H:%M')}")
-    print(f"预计到达时间：{arrival_time.strftime('%H:%M')}")
+        # 输出当前时间和预计到达时间，精确到分钟
+        print(f"当前时间：{current_time.strftime('%H:%M')}")
+        print(f"预计到达时间：{arrival_time.strftime('%H:%M')}")
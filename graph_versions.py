@@ -0,0 +1,250 @@
+#graph_versions.py
+
+
+import threading
+import time
+from contextlib import contextmanager
+
+from Graph import GraphAL, GraphError
+from dynamic_sssp import DynamicShortestPaths
+
+
+class GraphSnapshot(GraphAL):
+    def __init__(self, base_rows, line_rows, closed_lines, version):
+        """
+        图的只读快照：在共享的基础邻接表上叠加线路停用掩码。
+        只有包含停用线路边的行会被复制，其余行与基础图及其他快照共享。
+        :param base_rows: 基础邻接表（不会被修改）
+        :param line_rows: 线路ID -> 包含该线路边的顶点集合
+        :param closed_lines: 停用线路ID的 frozenset
+        :param version: 版本号
+        """
+        self._vnum = len(base_rows)
+        self._unconn = float('inf')
+        self.closed_lines = closed_lines
+        self.version = version
+
+        mat = list(base_rows)  # 只复制行引用
+        affected = set()
+        for line_id in closed_lines:
+            affected.update(line_rows.get(line_id, ()))
+        for vi in affected:
+            mat[vi] = [(vj, time, distance, line_id, is_active and line_id not in closed_lines)
+                       for vj, time, distance, line_id, is_active in base_rows[vi]]
+        self._mat = mat
+
+    def add_vertex(self):
+        """
+        快照不可修改。
+        :raises GraphError: 异常，表明不支持此操作
+        """
+        raise GraphError("GraphSnapshot is immutable.")
+
+    def add_edge(self, vi, vj, time, distance, line_id, is_active=True):
+        """
+        快照不可修改，线路启停请使用 GraphVersions。
+        :raises GraphError: 异常，表明不支持此操作
+        """
+        raise GraphError("GraphSnapshot is immutable.")
+
+
+class GraphVersions:
+    def __init__(self, graph, route_cache=0):
+        """
+        管理图的多个版本：每次线路启停生成新的快照，查询固定使用开始时的版本。
+        :param graph: stations_to_graph 新生成的完整图，之后不应再被修改
+        :param route_cache: 大于 0 时缓存最近查询的这么多个起点的最短时间树，
+                            发布新版本时按其停用线路集合增量修复，见 shortest_route
+        """
+        self._base_rows = [list(graph.out_edges(vi)) for vi in range(graph.vertex_num())]
+        self._line_rows = {}
+        for vi, row in enumerate(self._base_rows):
+            for edge in row:
+                self._line_rows.setdefault(edge[3], set()).add(vi)
+
+        self._lock = threading.Lock()
+        self._current = GraphSnapshot(self._base_rows, self._line_rows, frozenset(), 0)
+        self._readers = {}  # 版本号 -> 正在使用该版本的查询数量
+        self._live = {0: self._current}  # 仍被当前版本或查询引用的快照
+        self._routes = DynamicShortestPaths(graph, route_cache) if route_cache > 0 else None
+
+    def current(self):
+        """
+        获取当前最新版本的快照（不固定版本）。
+        :return: GraphSnapshot 对象
+        """
+        return self._current
+
+    @contextmanager
+    def pin(self):
+        """
+        固定当前版本供一次查询使用；查询期间即使有线路启停，读到的图也不会变化。
+        用法：with versions.pin() as graph: ...
+        """
+        with self._lock:
+            snapshot = self._current
+            self._readers[snapshot.version] = self._readers.get(snapshot.version, 0) + 1
+        try:
+            yield snapshot
+        finally:
+            with self._lock:
+                version = snapshot.version
+                self._readers[version] -= 1
+                if not self._readers[version]:
+                    del self._readers[version]
+                    if snapshot is not self._current:
+                        self._live.pop(version, None)  # 旧版本已无人使用，释放
+
+    def delete_line(self, line_id):
+        """
+        停用线路，生成新版本。
+        :param line_id: 要停用的线路ID
+        :return: 新版本的快照
+        """
+        return self._publish(lambda closed: closed | {line_id})
+
+    def add_line(self, line_id):
+        """
+        恢复线路，生成新版本。
+        :param line_id: 要恢复的线路ID
+        :return: 新版本的快照
+        """
+        return self._publish(lambda closed: closed - {line_id})
+
+    def shortest_route(self, start, end):
+        """
+        用缓存的最短时间树查询当前版本上的最短时间路径。
+        命中缓存时只在锁内沿树取出路径；未命中时在锁外按当前快照的停用线路计算最短时间树，
+        再在锁内确认版本未变后加入缓存，计算期间不阻塞其他查询和线路启停。
+        :param start: 起始站点索引
+        :param end: 终点站点索引
+        :return: (查询使用的快照, (站点路径, 总时间, 总距离, 换乘次数))，不可达时结果为 None
+        :raises GraphError: 创建时未指定 route_cache
+        """
+        routes = self._routes
+        if routes is None:
+            raise GraphError("GraphVersions was created without route_cache.")
+        with self._lock:
+            snapshot = self._current
+            tree = routes.cached(start)
+            if tree is not None:
+                return snapshot, routes.sg.tree_path(tree.dist, tree.parent, end)
+
+        tree = routes.build(start, routes.active_mask(snapshot.closed_lines))
+        with self._lock:
+            if self._current is snapshot:  # 计算期间发布了新版本时树已过期，不加入缓存
+                routes.insert(start, tree)
+        return snapshot, routes.sg.tree_path(tree.dist, tree.parent, end)
+
+    def _publish(self, update):
+        """
+        根据停用线路集合的变化生成并发布新版本，同时修复缓存的最短时间树、回收无人使用的旧版本。
+        """
+        with self._lock:
+            old = self._current
+            snapshot = GraphSnapshot(self._base_rows, self._line_rows,
+                                     frozenset(update(old.closed_lines)), old.version + 1)
+            if self._routes is not None:
+                self._routes.sync(snapshot.closed_lines)
+            self._current = snapshot
+            self._live[snapshot.version] = snapshot
+            if old.version not in self._readers:
+                self._live.pop(old.version, None)
+            return snapshot
+
+    def live_versions(self):
+        """
+        获取仍未释放的版本号列表。
+        :return: 版本号列表
+        """
+        with self._lock:
+            return sorted(self._live)
+
+
+def benchmark(json_file='stations.json', threads=4, duration=3.0, edit_interval=0.01, route_cache=32, seed=0):
+    """
+    多个线程反复执行同一组固定查询，比较有无线路启停时的查询吞吐量，并检查每次查询读到的版本一致。
+    写线程每次关闭一条线路后立即恢复，图在绝大部分时间与无写入时相同，两轮测试的搜索工作量一致，
+    吞吐量之差反映加锁、发布版本和修复缓存树的开销；同时统计读到含停用线路版本的查询比例。
+    读线程有两种模式：'pin' 固定版本后调用 dijkstra_top_k_paths(k=1)；
+    'route' 通过 shortest_route 查询（main.py 选项 1 的方式），起点取自少量热门起点，预先放入缓存。
+    :param json_file: 站点数据文件
+    :param threads: 查询线程数
+    :param duration: 每轮测试时长（秒）
+    :param edit_interval: 两次线路启停之间的间隔（秒）
+    :param route_cache: 'route' 模式缓存的起点数量
+    :param seed: 随机种子
+    """
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+    import json_loader
+    import graph_builder
+    import fast_path
+
+    stations = json_loader.json_to_stations(json_file)
+    graph, _ = graph_builder.stations_to_graph(stations)
+    n = graph.vertex_num()
+    rng = random.Random(seed)
+    hot = rng.sample(range(n), route_cache // 2)
+    queries = {
+        'pin': [(rng.randrange(n), rng.randrange(n)) for _ in range(200)],
+        'route': [(rng.choice(hot), rng.randrange(n)) for _ in range(200)],
+    }
+
+    def reader(versions, mode, offset, stop):
+        pairs = queries[mode]
+        count = closed_seen = 0
+        while not stop.is_set():
+            start, end = pairs[(offset + count) % len(pairs)]
+            if mode == 'route':
+                snapshot, _ = versions.shortest_route(start, end)
+            else:
+                with versions.pin() as snapshot:
+                    fast_path.dijkstra_top_k_paths(snapshot, start, end, k=1)
+                    # 查询结束时快照内容应与其停用线路集合一致
+                    for vi in range(0, n, 37):
+                        for edge in snapshot.out_edges(vi):
+                            assert edge[4] == (edge[3] not in snapshot.closed_lines)
+            closed_seen += bool(snapshot.closed_lines)
+            count += 1
+        return count, closed_seen
+
+    def writer(versions, lines, stop):
+        writer_rng = random.Random(seed)
+        edits = 0
+        publish_time = 0
+        while not stop.is_set():
+            line_id = writer_rng.choice(lines)
+            t0 = time.perf_counter()
+            versions.delete_line(line_id)
+            versions.add_line(line_id)
+            publish_time += time.perf_counter() - t0
+            edits += 2
+            time.sleep(edit_interval)
+        return edits, publish_time
+
+    for mode in ('pin', 'route'):
+        for with_edits in (False, True):
+            versions = GraphVersions(graph, route_cache if mode == 'route' else 0)
+            if mode == 'route':
+                for origin in hot:  # 预热缓存，两轮都从已缓存的状态开始
+                    versions.shortest_route(origin, origin)
+            lines = sorted(versions._line_rows)
+            stop = threading.Event()
+            with ThreadPoolExecutor(threads + 1) as pool:
+                readers = [pool.submit(reader, versions, mode, i * 200 // threads, stop) for i in range(threads)]
+                edits = pool.submit(writer, versions, lines, stop) if with_edits else None
+                time.sleep(duration)
+                stop.set()
+                results = [f.result() for f in readers]
+                edit_count, publish_time = edits.result() if edits else (0, 0)
+            total = sum(count for count, _ in results)
+            closed_seen = sum(seen for _, seen in results)
+            print(f"{mode} 模式，{threads} 个查询线程{'，同时启停线路' if with_edits else ''}："
+                  f"{total / duration:.0f} 次查询/秒（{closed_seen / max(total, 1):.1%} 读到含停用线路的版本），"
+                  f"线路启停 {edit_count} 次（平均每次 {publish_time / max(edit_count, 1) * 1000:.3f} 毫秒），"
+                  f"未释放版本 {versions.live_versions()}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,155 @@
+#instrumentation.py
+
+
+import cProfile
+import io
+import os
+import pstats
+import time
+from contextlib import contextmanager
+
+
+# 设置环境变量 SUBWAY_METRICS 后默认开启统计；关闭时各搜索函数只在结束时检查一次该开关
+enabled = bool(os.environ.get('SUBWAY_METRICS'))
+
+_counters = {}  # (搜索名称, 计数项) -> 累计值
+_queries = {}  # 搜索名称 -> 查询次数
+_phases = {}  # 阶段名称 -> [次数, 总耗时（秒）]
+_last_query = {}  # 搜索名称 -> 最近一次查询的计数
+
+
+def enable():
+    """
+    开启统计。
+    """
+    global enabled
+    enabled = True
+
+
+def disable():
+    """
+    关闭统计，已收集的数据保留。
+    """
+    global enabled
+    enabled = False
+
+
+def reset():
+    """
+    清空所有已收集的统计数据。
+    """
+    _counters.clear()
+    _queries.clear()
+    _phases.clear()
+    _last_query.clear()
+
+
+def record(search, **counts):
+    """
+    记录一次查询的计数，由各搜索函数在结束时调用。
+    :param search: 搜索名称，如 'fast_path'
+    :param counts: 计数项，如 heap_push=10, heap_pop=8；
+                   heap_push 统一包含搜索开始时放入队列的初始元素，因此 heap_push - heap_pop 为结束时队列中剩余的元素数
+    """
+    if not enabled:
+        return
+    _queries[search] = _queries.get(search, 0) + 1
+    for name, value in counts.items():
+        key = (search, name)
+        _counters[key] = _counters.get(key, 0) + value
+    _last_query[search] = counts
+
+
+def last_query(search):
+    """
+    获取某个搜索最近一次查询的计数。
+    :param search: 搜索名称
+    :return: 计数字典，没有记录时返回空字典
+    """
+    return dict(_last_query.get(search, {}))
+
+
+def phase_time(name):
+    """
+    获取某个阶段的累计耗时。
+    :param name: 阶段名称
+    :return: 累计耗时（秒）
+    """
+    return _phases.get(name, [0, 0.0])[1]
+
+
+@contextmanager
+def phase(name):
+    """
+    记录一个阶段（如 loading、fuzzy、search、render）的耗时。
+    :param name: 阶段名称
+    """
+    if not enabled:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        stat = _phases.setdefault(name, [0, 0.0])
+        stat[0] += 1
+        stat[1] += time.perf_counter() - t0
+
+
+def profile_query(func, *args, output_file=None, limit=20, **kwargs):
+    """
+    使用 cProfile 捕获单次查询的性能数据。
+    :param func: 要执行的查询函数
+    :param output_file: 可选，保存原始 profile 数据的文件路径（可用 pstats / snakeviz 查看）
+    :param limit: 打印耗时最多的函数数量，为 0 时不打印
+    :return: 查询函数的返回值
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+    if output_file:
+        profiler.dump_stats(output_file)
+    if limit:
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(limit)
+        print(stream.getvalue())
+    return result
+
+
+def export_text():
+    """
+    以 Prometheus 文本格式导出累计的统计数据。
+    :return: 文本内容
+    """
+    lines = [
+        "# HELP subway_queries_total Number of instrumented searches.",
+        "# TYPE subway_queries_total counter",
+    ]
+    for search, value in sorted(_queries.items()):
+        lines.append(f'subway_queries_total{{search="{search}"}} {value}')
+
+    names = sorted({name for _, name in _counters})
+    for name in names:
+        metric = f"subway_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for (search, counter), value in sorted(_counters.items()):
+            if counter == name:
+                lines.append(f'{metric}{{search="{search}"}} {value}')
+
+    lines.append("# HELP subway_phase_seconds Time spent in each phase.")
+    lines.append("# TYPE subway_phase_seconds summary")
+    for name, (count, total) in sorted(_phases.items()):
+        lines.append(f'subway_phase_seconds_sum{{phase="{name}"}} {total:.6f}')
+        lines.append(f'subway_phase_seconds_count{{phase="{name}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(file_path):
+    """
+    将统计数据写入文本文件，供本地采集程序读取。
+    先写临时文件再替换，避免采集程序读到不完整的内容。
+    :param file_path: 输出文件路径
+    """
+    tmp = file_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(export_text())
+    os.replace(tmp, file_path)
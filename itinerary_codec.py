@@ -0,0 +1,428 @@
+#itinerary_codec.py
+
+
+import hashlib
+import os
+from collections import OrderedDict
+
+from state_graph import TRANSFER_TIME
+
+
+TABLE_MAGIC = b'SRT1'  # 路线表文件头
+
+
+class ItineraryCodec:
+    def __init__(self, graph):
+        """
+        行程压缩编码：把站点路径存为按线路分段的行程段（线路区段、上车位置、下车位置），
+        打包为变长整数字节串，需要时再解码为站点列表或渲染文本。
+        每条线路先拆分为若干区段（无分叉的链或环），同一区段内每个站点只出现一次，
+        因此站点可以用它在区段中的位置表示。编码与线路的启停状态无关。
+        :param graph: 图对象
+        """
+        self.graph = graph
+        directed = {}  # (起点, 终点) -> 线路ID
+        line_adj = {}  # 线路ID -> {站点: 相邻站点集合}（无向）
+        for u in range(graph.vertex_num()):
+            for v, _, _, line_id, _ in graph.out_edges(u):
+                directed[(u, v)] = line_id
+                adj = line_adj.setdefault(line_id, {})
+                adj.setdefault(u, set()).add(v)
+                adj.setdefault(v, set()).add(u)
+
+        self.sections = []  # 区段编号 -> (线路ID, 站点列表, 是否为环)
+        for line_id in sorted(line_adj):
+            self.sections.extend((line_id, stations, ring) for stations, ring in _split_line(line_adj[line_id]))
+
+        self._positions = []  # 区段编号 -> {站点: 位置}
+        self._hops = {}  # (起点, 终点) -> (区段编号, 起点位置, 方向)
+        for s, (line_id, stations, ring) in enumerate(self.sections):
+            self._positions.append({station: i for i, station in enumerate(stations)})
+            size = len(stations)
+            for i in range(size if ring else size - 1):
+                a, b = stations[i], stations[(i + 1) % size]
+                if directed.get((a, b)) == line_id:
+                    self._hops[(a, b)] = (s, i, 1)
+                if directed.get((b, a)) == line_id:
+                    self._hops[(b, a)] = (s, (i + 1) % size, -1)
+
+        digest = hashlib.blake2b(digest_size=8)
+        for line_id, stations, ring in self.sections:
+            digest.update(f"{line_id}|{ring}|{','.join(map(str, stations))};".encode('utf-8'))
+        self.fingerprint = digest.digest()
+
+    def encode(self, path):
+        """
+        将站点路径编码为字节串。
+        格式：行程段数，第一段为（区段、上车位置、位移），之后每段为（区段、位移），
+        后续段的上车位置由上一段的下车站点推出；段数为 0 时紧跟唯一的站点索引。
+        :param path: 站点索引列表
+        :return: bytes
+        :raises ValueError: 路径中相邻两站之间没有边
+        """
+        buf = bytearray()
+        if len(path) < 2:
+            _put(buf, 0)
+            _put(buf, path[0])
+            return bytes(buf)
+
+        legs = []  # [区段, 上车位置, 位移, 方向, 当前位置]
+        for a, b in zip(path, path[1:]):
+            hop = self._hops.get((a, b))
+            if hop is None:
+                raise ValueError(f"{a} and {b} are not adjacent.")
+            s, pos, step = hop
+            if legs and legs[-1][0] == s and legs[-1][3] == step and legs[-1][4] == pos:
+                leg = legs[-1]
+            else:
+                leg = [s, pos, 0, step, pos]
+                legs.append(leg)
+            leg[2] += step
+            leg[4] = (pos + step) % len(self.sections[s][1])
+
+        _put(buf, len(legs))
+        for i, (s, board, delta, _, _) in enumerate(legs):
+            _put(buf, s)
+            if i == 0:
+                _put(buf, board)
+            _put(buf, delta << 1 if delta >= 0 else (-delta << 1) - 1)
+        return bytes(buf)
+
+    def _legs(self, data):
+        """
+        逐段解析字节串，生成 (区段编号, 上车位置, 位移)；不展开中间站点。
+        """
+        count, i = _get(data, 0)
+        station = None
+        for k in range(count):
+            s, i = _get(data, i)
+            if k == 0:
+                board, i = _get(data, i)
+            else:
+                board = self._positions[s][station]
+            z, i = _get(data, i)
+            delta = z >> 1 if not z & 1 else -((z + 1) >> 1)
+            stations = self.sections[s][1]
+            station = stations[(board + delta) % len(stations)]
+            yield s, board, delta
+
+    def legs(self, data):
+        """
+        解码为乘车段列表，同一线路的相邻区段合并为一段；不展开中间站点。
+        :param data: encode 返回的字节串
+        :return: [(线路ID, 上车站点索引, 下车站点索引), ...]，同站路径返回空列表
+        """
+        result = []
+        for s, board, delta in self._legs(data):
+            line_id, stations, _ = self.sections[s]
+            alight = stations[(board + delta) % len(stations)]
+            if result and result[-1][0] == line_id:
+                result[-1] = (line_id, result[-1][1], alight)
+            else:
+                result.append((line_id, stations[board], alight))
+        return result
+
+    def stations(self, data):
+        """
+        解码为完整的站点路径。
+        :param data: encode 返回的字节串
+        :return: 站点索引列表
+        """
+        count, i = _get(data, 0)
+        if count == 0:
+            return [_get(data, i)[0]]
+        path = []
+        for s, board, delta in self._legs(data):
+            stations = self.sections[s][1]
+            size = len(stations)
+            if not path:
+                path.append(stations[board])
+            step = 1 if delta > 0 else -1
+            path.extend(stations[(board + j * step) % size] for j in range(1, abs(delta) + 1))
+        return path
+
+    def result(self, data):
+        """
+        解码并按图计算总时间、总距离和换乘次数，格式与 dijkstra_top_k_paths 相同。
+        :param data: encode 返回的字节串
+        :return: (站点路径, 总时间, 总距离, 换乘次数)
+        """
+        path = self.stations(data)
+        total_time = 0
+        total_distance = 0
+        for a, b in zip(path, path[1:]):
+            edge = self.graph.get_edge(a, b)
+            total_time += edge[1]
+            total_distance += edge[2]
+        transfer_count = max(len(self.legs(data)) - 1, 0)
+        return path, total_time + transfer_count * TRANSFER_TIME, total_distance, transfer_count
+
+    def render(self, data, station_names):
+        """
+        渲染为与 query_station_time 相同的乘车线路文本。
+        :param data: encode 返回的字节串
+        :param station_names: 站点索引到名称的列表
+        :return: 文本字符串
+        """
+        legs = self.legs(data)
+        if not legs:
+            return station_names[self.stations(data)[0]]
+        lines = [f"乘坐地铁 {legs[0][0]} "]
+        path = self.stations(data)
+        k = 0  # 当前乘车段
+        for i, idx in enumerate(path):
+            if i > 0 and idx == legs[k][2] and i < len(path) - 1:
+                lines.append(f"{station_names[idx]} \n↓")
+                k += 1
+                lines.append(f"\n换乘线路：{legs[k][0]}")
+            elif i < len(path) - 1:
+                lines.append(f"{station_names[idx]} \n↓")
+            else:
+                lines.append(station_names[idx])
+        return '\n'.join(lines)
+
+
+class RouteTable:
+    def __init__(self, codec, capacity=None):
+        """
+        以压缩字节串保存的 (起点, 终点) -> 行程 映射。
+        capacity 为 None 时用作预计算路线表，可存盘；否则为最近最少使用淘汰的路线缓存。
+        :param codec: ItineraryCodec 对象
+        :param capacity: 最多保存的路线数量
+        """
+        self.codec = codec
+        self.capacity = capacity
+        self._routes = OrderedDict()
+
+    def __len__(self):
+        return len(self._routes)
+
+    def get(self, start, end):
+        """
+        获取路线的字节串，不存在时返回 None。
+        """
+        data = self._routes.get((start, end))
+        if data is not None and self.capacity is not None:
+            self._routes.move_to_end((start, end))
+        return data
+
+    def put(self, start, end, path):
+        """
+        编码并保存一条路线。
+        :param path: 站点索引列表
+        :return: 编码后的字节串
+        """
+        data = self.codec.encode(path)
+        self._routes[(start, end)] = data
+        if self.capacity is not None:
+            self._routes.move_to_end((start, end))
+            if len(self._routes) > self.capacity:
+                self._routes.popitem(last=False)
+        return data
+
+    def clear(self):
+        """
+        清空全部路线，线路启停后应调用。
+        """
+        self._routes.clear()
+
+    def nbytes(self):
+        """
+        所有行程字节串的总长度。
+        """
+        return sum(len(data) for data in self._routes.values())
+
+    def save(self, file_path):
+        """
+        将路线表写入二进制文件：文件头、编码指纹、路线数量，之后每条路线为
+        （起点、终点、长度、字节串）。先写临时文件再替换。
+        :param file_path: 输出文件路径
+        """
+        buf = bytearray(TABLE_MAGIC)
+        buf += self.codec.fingerprint
+        _put(buf, len(self._routes))
+        for (start, end), data in self._routes.items():
+            _put(buf, start)
+            _put(buf, end)
+            _put(buf, len(data))
+            buf += data
+        tmp = file_path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(buf)
+        os.replace(tmp, file_path)
+
+    @classmethod
+    def load(cls, codec, file_path, capacity=None):
+        """
+        从二进制文件中加载路线表。
+        :param codec: 与保存时使用同一线路数据的 ItineraryCodec 对象
+        :param file_path: 路线表文件路径
+        :param capacity: 见 __init__
+        :return: RouteTable 对象
+        :raises ValueError: 文件格式不正确或线路数据与保存时不一致
+        """
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        if data[:4] != TABLE_MAGIC:
+            raise ValueError(f"{file_path} is not a route table file.")
+        if data[4:12] != codec.fingerprint:
+            raise ValueError(f"{file_path} was built from different line data.")
+        table = cls(codec, capacity)
+        count, i = _get(data, 12)
+        for _ in range(count):
+            start, i = _get(data, i)
+            end, i = _get(data, i)
+            size, i = _get(data, i)
+            table._routes[(start, end)] = data[i:i + size]
+            i += size
+        return table
+
+
+def _split_line(adj):
+    """
+    将一条线路的无向子图拆分为区段：先从度数不为 2 的站点出发走出各条链，
+    剩下的边都在环上。首尾相同的链按环处理，保证区段内站点不重复。
+    :param adj: {站点: 相邻站点集合}
+    :return: [(站点列表, 是否为环), ...]
+    """
+    used = set()
+    sections = []
+
+    def walk(start, first):
+        chain = [start]
+        prev, cur = start, first
+        used.add(frozenset((start, first)))
+        while cur != start and len(adj[cur]) == 2:
+            chain.append(cur)
+            nxt = next(iter(adj[cur] - {prev}))
+            edge = frozenset((cur, nxt))
+            if edge in used:
+                break
+            used.add(edge)
+            prev, cur = cur, nxt
+        else:
+            if cur != start:
+                chain.append(cur)
+        return chain, cur == start
+
+    for u in sorted(adj):
+        if len(adj[u]) != 2:
+            for v in sorted(adj[u]):
+                if frozenset((u, v)) not in used:
+                    sections.append(walk(u, v))
+    for u in sorted(adj):
+        for v in sorted(adj[u]):
+            if frozenset((u, v)) not in used:
+                sections.append(walk(u, v))
+    return sections
+
+
+def _put(buf, n):
+    """
+    以 LEB128 变长整数格式追加非负整数。
+    """
+    while n >= 0x80:
+        buf.append((n & 0x7f) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def _get(data, i):
+    """
+    从位置 i 读取一个变长整数。
+    :return: (整数, 下一个位置)
+    """
+    n = shift = 0
+    while True:
+        b = data[i]
+        i += 1
+        n |= (b & 0x7f) << shift
+        if b < 0x80:
+            return n, i
+        shift += 7
+
+
+def benchmark(json_file='stations.json', table_file=None):
+    """
+    对全部站点对的最短时间路线进行编码，打印每条行程的字节数以及编码、解码吞吐量，
+    并与站点列表的 JSON 和 16 位整数数组存储方式比较。
+    :param json_file: 站点数据文件
+    :param table_file: 若指定，同时测试路线表的存盘和加载
+    """
+    import json
+    import time
+    from array import array
+    import json_loader
+    import graph_builder
+    from state_graph import StateGraph
+
+    stations = json_loader.json_to_stations(json_file)
+    graph, station_index_map = graph_builder.stations_to_graph(stations)
+    station_names = list(station_index_map.keys())
+    sg = StateGraph(graph)
+    n = graph.vertex_num()
+
+    t0 = time.perf_counter()
+    codec = ItineraryCodec(graph)
+    print(f"线路区段 {len(codec.sections)} 个，建表 {(time.perf_counter() - t0) * 1000:.1f} 毫秒")
+
+    routes = []
+    for start in range(n):
+        dist, parent = sg.shortest_path_tree(start)
+        for end in range(n):
+            result = sg.tree_path(dist, parent, end)
+            if result is not None:
+                routes.append((start, end, result))
+    print(f"全部站点对路线 {len(routes)} 条")
+
+    t0 = time.perf_counter()
+    encoded = [codec.encode(path) for _, _, (path, _, _, _) in routes]
+    encode_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for data in encoded:
+        codec.legs(data)
+    legs_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    decoded = [codec.stations(data) for data in encoded]
+    stations_time = time.perf_counter() - t0
+
+    sample = encoded[::50]
+    t0 = time.perf_counter()
+    for data in sample:
+        codec.render(data, station_names)
+    render_time = (time.perf_counter() - t0) / len(sample) * len(encoded)
+
+    for (_, _, (path, total_time, total_distance, transfer_count)), data, path2 in zip(routes, encoded, decoded):
+        assert path2 == path
+        _, t, d, k = codec.result(data)
+        assert abs(t - total_time) < 1e-6 and abs(d - total_distance) < 1e-6 and k == transfer_count
+
+    count = len(encoded)
+    packed = sum(len(data) for data in encoded)
+    as_json = sum(len(json.dumps(path)) for _, _, (path, _, _, _) in routes)
+    as_array = sum(len(array('H', path).tobytes()) for _, _, (path, _, _, _) in routes)
+    print(f"平均每条行程：压缩编码 {packed / count:.2f} 字节，16 位整数数组 {as_array / count:.2f} 字节，"
+          f"JSON 站点列表 {as_json / count:.2f} 字节")
+    print(f"编码 {count / encode_time:,.0f} 条/秒；解码乘车段 {count / legs_time:,.0f} 条/秒，"
+          f"解码站点列表 {count / stations_time:,.0f} 条/秒，渲染文本 {count / render_time:,.0f} 条/秒（抽样估算）")
+
+    if table_file:
+        table = RouteTable(codec)
+        for start, end, (path, _, _, _) in routes:
+            table.put(start, end, path)
+        t0 = time.perf_counter()
+        table.save(table_file)
+        save_time = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        loaded = RouteTable.load(codec, table_file)
+        load_time = time.perf_counter() - t0
+        assert len(loaded) == len(table)
+        print(f"路线表文件 {os.path.getsize(table_file) / 1024:.0f} KB，"
+              f"存盘 {save_time * 1000:.0f} 毫秒，加载 {load_time * 1000:.0f} 毫秒")
+
+
+if __name__ == "__main__":
+    import sys
+    benchmark(table_file=sys.argv[1] if len(sys.argv) > 1 else None)
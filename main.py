@@ -1,22 +1,63 @@
 #mian.py
 
 
+import os
+
 import json_loader
 import fast_path
 import convenient_path
-import edit_path
 import graph_builder
+import disruption_analysis
+import instrumentation
+from graph_versions import GraphVersions
 from fuzzy_search import fuzzy_search, get_all_lines  # 引入模糊查询模块
 
 
 # 全局变量声明
-graph = None
+versions = None  # 图的版本管理，线路增删生成新的只读快照
 station_index_map = None
 stations = None
 
 
+def query_fastest(start_station, end_station):
+    """
+    查询时间最短的路径：由 versions 缓存的最短时间树回答，线路增删后这些树已增量修复。
+    :param start_station: 起始站名称
+    :param end_station: 终点站名称
+    """
+    start = station_index_map.get(start_station)
+    end = station_index_map.get(end_station)
+    if start is None or end is None:
+        fast_path.query_station_time(versions.current(), station_index_map, start_station, end_station)
+        return
+
+    with instrumentation.phase('search'):
+        graph, result = versions.shortest_route(start, end)
+    fast_path.query_station_time(graph, station_index_map, start_station, end_station,
+                                 paths=[result] if result else [])
+
+
+def run_query(query, *args):
+    """
+    执行一次路径查询。
+    设置环境变量 SUBWAY_PROFILE=文件路径 时，用 cProfile 捕获本次查询并保存到该文件；
+    设置环境变量 SUBWAY_METRICS=文件路径 时，每次查询后将累计的统计数据写入该文件。
+    :param query: 查询函数，如 fast_path.query_station_time
+    :param args: 查询函数的参数
+    """
+    profile_file = os.environ.get('SUBWAY_PROFILE')
+    if profile_file:
+        instrumentation.profile_query(query, *args, output_file=profile_file, limit=0)
+    else:
+        query(*args)
+
+    metrics_file = os.environ.get('SUBWAY_METRICS')
+    if instrumentation.enabled and metrics_file:
+        instrumentation.write_metrics(metrics_file)
+
+
 def main():
-    global graph, station_index_map, stations
+    global versions, station_index_map, stations
 
     """
     主程序入口点，提供用户界面以执行不同的操作。
@@ -25,18 +66,21 @@ def main():
     2. 查询换乘最少的路径
     3. 删除地铁线路
     4. 增加地铁线路
+    5. 线路停运影响分析
     0. 退出程序
     """
     
-    # 加载 JSON 数据
-    json_file = 'stations.json'
-    stations = json_loader.json_to_stations(json_file)
+    with instrumentation.phase('loading'):
+        # 加载 JSON 数据
+        json_file = 'stations.json'
+        stations = json_loader.json_to_stations(json_file)
 
-    # 生成站点索引映射，方便通过站点名称快速查找索引
-    station_index_map = {name: i for i, name in enumerate(stations.keys())}
-    
-    # 生成图并更新全局变量
-    graph, _ = graph_builder.stations_to_graph(stations)
+        # 生成站点索引映射，方便通过站点名称快速查找索引
+        station_index_map = {name: i for i, name in enumerate(stations.keys())}
+
+        # 生成图并创建版本管理
+        graph, _ = graph_builder.stations_to_graph(stations)
+        versions = GraphVersions(graph, route_cache=32)
 
     while True:
         print()
@@ -47,6 +91,7 @@ def main():
         print("2. 查询换乘最少的路径")
         print("3. 删除地铁线路")
         print("4. 增加地铁线路")
+        print("5. 线路停运影响分析")
         print("0. 退出程序")
 
         option = input("请选择您的操作：").strip()
@@ -57,8 +102,8 @@ def main():
             break
 
         # 判断输入是否合法
-        if option not in ['1', '2', '3', '4']:
-            print("无效的选择，请输入 0、1、2、3 或 4。")
+        if option not in ['1', '2', '3', '4', '5']:
+            print("无效的选择，请输入 0、1、2、3、4 或 5。")
             continue
 
         print()
@@ -70,19 +115,21 @@ def main():
             end_station = input("请输入终点站：").strip()
 
             # 进行模糊匹配
-            all_stations = list(stations.keys())
-            start_station = fuzzy_search(start_station, all_stations) or start_station
-            end_station = fuzzy_search(end_station, all_stations) or end_station
+            with instrumentation.phase('fuzzy'):
+                all_stations = list(stations.keys())
+                start_station = fuzzy_search(start_station, all_stations) or start_station
+                end_station = fuzzy_search(end_station, all_stations) or end_station
 
             print()
 
             # 根据用户选择调用相应的路径查询函数
             if option == '1':
                 # 查询时间最短的路径
-                fast_path.query_station_time(graph, station_index_map, start_station, end_station)
+                run_query(query_fastest, start_station, end_station)
             elif option == '2':
-                # 查询换乘最少的路径
-                convenient_path.query_station_transfer(graph, station_index_map, start_station, end_station)
+                # 查询换乘最少的路径，查询期间固定使用同一版本的图
+                with versions.pin() as graph:
+                    run_query(convenient_path.query_station_transfer, graph, station_index_map, start_station, end_station)
 
         # 如果选择 3 或 4，则进行线路增删操作
         elif option == '3':
@@ -95,11 +142,8 @@ def main():
             # 进行模糊匹配
             line_id = fuzzy_search(line_id, all_lines) or line_id
 
-            # 生成站点的连通图，确保更新后的图反映所有的变化
-            graph, _ = graph_builder.stations_to_graph(stations)
-
-            # 调用删除线路的函数
-            edit_path.delete_path(graph, line_id)
+            # 生成停用该线路的新版本，正在进行的查询仍使用旧版本
+            versions.delete_line(line_id)
 
             print(f"已删除线路 {line_id}。")
 
@@ -113,14 +157,17 @@ def main():
             # 进行模糊匹配
             line_id = fuzzy_search(line_id, all_lines) or line_id
 
-            # 生成站点的连通图，确保更新后的图反映所有的变化
-            graph, _ = graph_builder.stations_to_graph(stations)
-
-            # 调用增加线路的函数
-            edit_path.add_path(graph, line_id)
+            # 生成恢复该线路的新版本
+            versions.add_line(line_id)
 
             print(f"已增加线路 {line_id}。")
 
+        elif option == '5':
+            # 在完整的连通图上逐条模拟线路停运，统计对全网出行的影响
+            base_graph, _ = graph_builder.stations_to_graph(stations)
+            results = disruption_analysis.analyze(base_graph, 'line')
+            disruption_analysis.print_report(results, list(station_index_map.keys()))
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,368 @@
+#partitioned_graph.py
+
+
+import heapq
+import json
+import os
+import time
+from collections import OrderedDict
+
+from state_graph import StateGraph
+
+
+def _search(adj, sources, targets=None):
+    """
+    在给定邻接表上运行 Dijkstra，同时累计距离和换乘次数。
+    :param adj: 状态 -> [(目标状态, 时间, 距离, 换乘次数), ...]
+    :param sources: 起始状态 -> (时间, 距离, 换乘次数)
+    :param targets: 可选的目标状态集合，全部结算后提前停止
+    :return: 状态 -> (时间, 距离, 换乘次数, 父状态)
+    """
+    labels = {s: (t, d, k, None) for s, (t, d, k) in sources.items()}
+    pq = [(t, s) for s, (t, _, _) in sources.items()]
+    heapq.heapify(pq)
+    done = set()
+    remaining = set(targets) if targets is not None else None
+    while pq:
+        c, x = heapq.heappop(pq)
+        if x in done:
+            continue
+        done.add(x)
+        if remaining is not None:
+            remaining.discard(x)
+            if not remaining:
+                break
+        _, d, k, _ = labels[x]
+        for y, t, dd, kk in adj.get(x, ()):
+            nc = c + t
+            old = labels.get(y)
+            if old is None or nc < old[0]:
+                labels[y] = (nc, d + dd, k + kk, x)
+                heapq.heappush(pq, (nc, y))
+    return labels
+
+
+def suffix_regions(station_index_map):
+    """
+    按站点名称的 "#编号" 后缀划分区域，与 synthetic_network 生成的合成网络对应。
+    :param station_index_map: 站点名称到索引的映射
+    :return: 站点索引 -> 区域名称 的列表
+    """
+    regions = [None] * len(station_index_map)
+    for name, i in station_index_map.items():
+        regions[i] = name.rsplit('#', 1)[1] if '#' in name else '0'
+    return regions
+
+
+def build_partitions(graph, region_of, directory):
+    """
+    按区域划分线路感知状态图，并将各区域子图和跨区域的覆盖图写入目录。
+    覆盖图包含所有边界状态（有跨区域边的状态）、跨区域边，以及每个区域内边界状态两两之间的最短时间表；
+    最短时间表同时保存对应的站点序列，展开路径时无需加载途经区域。
+    :param graph: 图对象
+    :param region_of: 站点索引 -> 区域名称 的列表
+    :param directory: 输出目录
+    """
+    sg = StateGraph(graph)
+    names = sorted(set(region_of))
+    rid = {name: i for i, name in enumerate(names)}
+    state_region = [rid[region_of[station]] for station, _ in sg.states]
+
+    region_arcs = [{} for _ in names]
+    crossing = []
+    boundary = set()
+    for u in range(sg.state_num()):
+        for v, t, d, k in sg.adj[u]:
+            if state_region[u] == state_region[v]:
+                region_arcs[state_region[u]].setdefault(u, []).append((v, t, d, k))
+            else:
+                crossing.append([u, v, t, d, k])
+                boundary.update((u, v))
+
+    # 每个区域内从每个边界状态出发，计算到同区域其他边界状态的最短时间表
+    region_boundary = [[] for _ in names]
+    for b in sorted(boundary):
+        region_boundary[state_region[b]].append(b)
+    shortcuts = []
+    for r, states in enumerate(region_boundary):
+        for b in states:
+            labels = _search(region_arcs[r], {b: (0, 0, 0)}, set(states))
+            for b2 in states:
+                if b2 != b and b2 in labels:
+                    t, d, k, x = labels[b2]
+                    stations = [sg.states[b2][0]]
+                    while x is not None:
+                        stations.append(sg.states[x][0])
+                        x = labels[x][3]
+                    stations.reverse()
+                    shortcuts.append([b, b2, t, d, k, stations])
+
+    os.makedirs(directory, exist_ok=True)
+    for r in range(len(names)):
+        states = [[s, station, line_id] for s, (station, line_id) in enumerate(sg.states) if state_region[s] == r]
+        arcs = [[u, v, t, d, k] for u, row in region_arcs[r].items() for v, t, d, k in row]
+        with open(os.path.join(directory, f"region_{r}.json"), 'w', encoding='utf-8') as f:
+            json.dump({'states': states, 'arcs': arcs}, f, ensure_ascii=False, separators=(',', ':'))
+
+    overlay = {
+        'regions': names,
+        'station_region': [rid[name] for name in region_of],
+        'boundary': [[b, sg.states[b][0]] for b in sorted(boundary)],
+        'crossing': crossing,
+        'shortcuts': shortcuts,
+    }
+    with open(os.path.join(directory, 'overlay.json'), 'w', encoding='utf-8') as f:
+        json.dump(overlay, f, ensure_ascii=False, separators=(',', ':'))
+
+
+class Region:
+    def __init__(self, file_path):
+        """
+        从文件加载单个区域的子图。
+        :param file_path: 区域文件路径
+        """
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.state_station = {}  # 状态 -> 站点索引
+        self.station_states = {}  # 站点索引 -> 该站所有状态
+        for s, station, _ in data['states']:
+            self.state_station[s] = station
+            self.station_states.setdefault(station, []).append(s)
+        self.adj = {}
+        self.radj = {}
+        for u, v, t, d, k in data['arcs']:
+            self.adj.setdefault(u, []).append((v, t, d, k))
+            self.radj.setdefault(v, []).append((u, t, d, k))
+
+
+class PartitionedGraph:
+    def __init__(self, directory, cache_size=4):
+        """
+        分区路由：常驻内存的只有覆盖图，区域子图在查询需要时从磁盘加载并按最近使用缓存。
+        :param directory: build_partitions 的输出目录
+        :param cache_size: 最多同时缓存的区域数量
+        """
+        self.directory = directory
+        self.cache_size = cache_size
+        self._regions = OrderedDict()
+        with open(os.path.join(directory, 'overlay.json'), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.region_names = data['regions']
+        self.station_region = data['station_region']
+        self.boundary_station = {b: station for b, station in data['boundary']}
+        self.region_boundary = [[] for _ in self.region_names]
+        for b, station in data['boundary']:
+            self.region_boundary[self.station_region[station]].append(b)
+        # 覆盖图邻接表元素格式为 (目标状态, 时间, 距离, 换乘次数, 途经站点)，途经站点为 None 表示跨区域边
+        self.overlay = {}
+        for u, v, t, d, k in data['crossing']:
+            self.overlay.setdefault(u, []).append((v, t, d, k, None))
+        for u, v, t, d, k, stations in data['shortcuts']:
+            self.overlay.setdefault(u, []).append((v, t, d, k, stations))
+
+    def region(self, r):
+        """
+        获取区域子图，未缓存时从磁盘加载。
+        :param r: 区域编号
+        :return: Region 对象
+        """
+        region = self._regions.get(r)
+        if region is not None:
+            self._regions.move_to_end(r)
+            return region
+        region = Region(os.path.join(self.directory, f"region_{r}.json"))
+        self._regions[r] = region
+        if len(self._regions) > self.cache_size:
+            self._regions.popitem(last=False)
+        return region
+
+    def query(self, start, end):
+        """
+        查询最短时间路径：起点区域内局部搜索 + 覆盖图搜索 + 终点区域内局部搜索。
+        :param start: 起始站点索引
+        :param end: 终点站点索引
+        :return: (站点路径, 总时间, 总距离, 换乘次数)，不可达时返回 None
+        """
+        if start == end:
+            return [start], 0, 0, 0
+        a = self.station_region[start]
+        b = self.station_region[end]
+        ra = self.region(a)
+        fwd = _search(ra.adj, {s: (0, 0, 0) for s in ra.station_states.get(start, ())})
+        rb = self.region(b)
+        bwd = _search(rb.radj, {s: (0, 0, 0) for s in rb.station_states.get(end, ())})
+
+        inf = float('inf')
+        best = inf
+        best_end = None  # ('local', 终点状态) 或 ('overlay', 边界状态)
+        if a == b:
+            for s in rb.station_states.get(end, ()):
+                if s in fwd and fwd[s][0] < best:
+                    best = fwd[s][0]
+                    best_end = ('local', s)
+
+        # 覆盖图搜索：以起点区域边界状态的局部最短时间为初值
+        dist = {}
+        parent = {}
+        pq = []
+        for s in self.region_boundary[a]:
+            if s in fwd:
+                dist[s] = fwd[s][0]
+                parent[s] = None
+                pq.append((dist[s], s))
+        heapq.heapify(pq)
+        exits = {s for s in self.region_boundary[b] if s in bwd}
+        while pq:
+            c, x = heapq.heappop(pq)
+            if c >= best:
+                break
+            if c > dist[x]:
+                continue
+            if x in exits and c + bwd[x][0] < best:
+                best = c + bwd[x][0]
+                best_end = ('overlay', x)
+            for y, t, d, k, via in self.overlay.get(x, ()):
+                nc = c + t
+                if nc < dist.get(y, inf):
+                    dist[y] = nc
+                    parent[y] = (x, d, k, via)
+                    heapq.heappush(pq, (nc, y))
+
+        if best_end is None:
+            return None
+
+        kind, last = best_end
+        if kind == 'local':
+            states = self._walk(fwd, last)
+            stations = [ra.state_station[s] for s in states]
+            _, total_distance, transfer_count, _ = fwd[last]
+            return self._merge(stations), best, total_distance, transfer_count
+
+        # 覆盖图部分：从终点侧边界状态回溯到起点侧边界状态
+        hops = []
+        x = last
+        while parent[x] is not None:
+            hops.append((parent[x], x))
+            x = parent[x][0]
+        hops.reverse()
+        first = x
+
+        prefix = self._walk(fwd, first)
+        stations = [ra.state_station[s] for s in prefix]
+        _, total_distance, transfer_count, _ = fwd[first]
+        for (u, d, k, via), v in hops:
+            total_distance += d
+            transfer_count += k
+            if via is None:
+                stations.append(self.boundary_station[v])
+            else:
+                stations.extend(via[1:])
+
+        # 终点区域内：反向搜索的父状态即通往终点的下一个状态
+        _, d, k, x = bwd[last]
+        total_distance += d
+        transfer_count += k
+        while x is not None:
+            stations.append(rb.state_station[x])
+            x = bwd[x][3]
+        return self._merge(stations), best, total_distance, transfer_count
+
+    @staticmethod
+    def _walk(labels, s):
+        """
+        沿父状态回溯，返回从搜索起点到 s 的状态路径。
+        """
+        path = []
+        while s is not None:
+            path.append(s)
+            s = labels[s][3]
+        path.reverse()
+        return path
+
+    @staticmethod
+    def _merge(stations):
+        """
+        合并同站换乘产生的重复站点。
+        """
+        path = []
+        for station in stations:
+            if not path or path[-1] != station:
+                path.append(station)
+        return path
+
+
+def benchmark(json_file='stations.json', regions=20, queries=100, seed=0):
+    """
+    在合成的多区域网络上比较分区路由与全图搜索的内存占用和查询延迟，并打印结果。
+    :param json_file: 站点数据文件
+    :param regions: 区域数量
+    :param queries: 随机查询次数
+    :param seed: 随机种子
+    """
+    import gc
+    import random
+    import tempfile
+    import tracemalloc
+    import json_loader
+    import graph_builder
+    from synthetic_network import scale_stations
+
+    stations = scale_stations(json_loader.json_to_stations(json_file), regions, seed=seed)
+    rng = random.Random(seed)
+
+    tracemalloc.start()
+    graph, station_index_map = graph_builder.stations_to_graph(stations)
+    sg = StateGraph(graph)
+    flat_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    n = graph.vertex_num()
+    pairs = [(rng.randrange(n), rng.randrange(n)) for _ in range(queries)]
+    adj = dict(enumerate(sg.adj))
+    t0 = time.perf_counter()
+    flat = []
+    for s, e in pairs:
+        targets = set(sg.station_states[e])
+        labels = _search(adj, {x: (0, 0, 0) for x in sg.station_states[s]}, targets)
+        reached = [labels[x][0] for x in targets if x in labels]
+        flat.append(min(reached) if reached else None)
+    flat_ms = (time.perf_counter() - t0) / queries * 1000
+
+    with tempfile.TemporaryDirectory() as directory:
+        t0 = time.perf_counter()
+        build_partitions(graph, suffix_regions(station_index_map), directory)
+        build_time = time.perf_counter() - t0
+        del graph, sg, adj
+        gc.collect()
+
+        tracemalloc.start()
+        pg = PartitionedGraph(directory)
+        overlay_memory = tracemalloc.get_traced_memory()[0]
+        results = [pg.query(s, e) for s, e in pairs]
+        partitioned_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        # 延迟单独测量，避免 tracemalloc 的开销：先用默认缓存（多数查询需要从磁盘加载区域），再在全部区域已缓存时测量
+        pg = PartitionedGraph(directory)
+        t0 = time.perf_counter()
+        for s, e in pairs:
+            pg.query(s, e)
+        cold_ms = (time.perf_counter() - t0) / queries * 1000
+        pg = PartitionedGraph(directory, cache_size=regions)
+        for s, e in pairs:
+            pg.query(s, e)
+        t0 = time.perf_counter()
+        for s, e in pairs:
+            pg.query(s, e)
+        warm_ms = (time.perf_counter() - t0) / queries * 1000
+
+    for r, f in zip(results, flat):
+        assert (r is None) == (f is None) and (r is None or abs(r[1] - f) < 1e-6)
+    print(f"{regions} 个区域，{n} 个站点：分区预处理 {build_time:.2f} 秒")
+    print(f"全图：内存 {flat_memory / 1024 / 1024:.1f} MB，平均查询 {flat_ms:.2f} 毫秒")
+    print(f"分区：覆盖图内存 {overlay_memory / 1024 / 1024:.1f} MB，查询期间峰值 {partitioned_memory / 1024 / 1024:.1f} MB，"
+          f"平均查询 {cold_ms:.2f} 毫秒（按需加载区域），{warm_ms:.2f} 毫秒（区域已缓存）")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,159 @@
+#reachability.py
+
+
+import time
+
+try:
+    import numpy as np
+except ImportError:  # 未安装 NumPy 时退回纯 Python 实现
+    np = None
+
+from state_graph import StateGraph, STOP_TIME
+
+
+def reachable_stations(sg, origin, minutes):
+    """
+    计算从起点站出发在限定时间内可以到达的所有站点（等时圈）。
+    时间为乘车、换乘和每站停车时间之和，与路线查询显示的总时间口径相同。
+    :param sg: StateGraph 对象
+    :param origin: 起始站点索引
+    :param minutes: 时间上限（分钟）
+    :return: (times, transfers)，长度为站点数量的 array；超出时间上限的站点时间为 inf，换乘次数为 -1
+    """
+    return sg.station_arrivals(origin, max_time=minutes * 60, dwell=STOP_TIME)
+
+
+def meeting_station(sg, origins, mode='minimax', minutes=None):
+    """
+    为多人选择最佳碰面站点，用时包含每站停车时间。
+    :param sg: StateGraph 对象
+    :param origins: 各人出发站点索引列表
+    :param mode: 'minimax' 使所有人中最长的用时最短；'minisum' 使所有人用时之和最短
+    :param minutes: 可选的时间上限（分钟），用于缩小每个起点的搜索范围
+    :return: (碰面站点索引, 各人到达该站的时间列表)，origins 为空或没有所有人都能到达的站点时返回 None
+    """
+    if mode not in ('minimax', 'minisum'):
+        raise ValueError(f"Unknown meeting mode '{mode}'.")
+    if not origins:
+        return None
+    max_time = float('inf') if minutes is None else minutes * 60
+    rows = [sg.station_arrivals(origin, max_time=max_time, dwell=STOP_TIME)[0] for origin in origins]
+
+    if np is not None:
+        # 各起点的到达时间组成 (人数, 站点数) 矩阵，按列聚合后取最小值
+        mat = np.vstack([np.frombuffer(row, dtype=np.float64) for row in rows])
+        score = mat.max(axis=0) if mode == 'minimax' else mat.sum(axis=0)
+        best = int(np.argmin(score))
+        if not np.isfinite(score[best]):
+            return None
+        return best, mat[:, best].tolist()
+
+    aggregate = max if mode == 'minimax' else sum
+    score = [aggregate(column) for column in zip(*rows)]
+    best = min(range(len(score)), key=score.__getitem__, default=None)
+    if best is None or score[best] == float('inf'):
+        return None
+    return best, [row[best] for row in rows]
+
+
+def query_reachable_stations(graph, station_index_map, start_station, minutes):
+    """
+    查询从起点站出发在限定时间内可以到达的站点，按用时从短到长输出。
+    :param graph: 图对象
+    :param station_index_map: 站点名称到索引的映射
+    :param start_station: 起始站名称
+    :param minutes: 时间上限（分钟）
+    """
+    start = station_index_map.get(start_station)
+    if start is None:
+        print(f"输入的站点 {start_station} 不存在。")
+        return
+
+    times, transfers = reachable_stations(StateGraph(graph), start, minutes)
+    station_names = list(station_index_map.keys())
+    reached = sorted((t, i) for i, t in enumerate(times) if t != float('inf'))
+
+    print(f"\n从 {start_station} 出发 {minutes} 分钟内可到达 {len(reached)} 个站点：")
+    for t, i in reached:
+        print(f"{station_names[i]}：{int(t / 60)} 分钟，换乘 {transfers[i]} 次")
+
+
+def query_meeting_station(graph, station_index_map, start_stations, mode='minimax'):
+    """
+    查询多人的最佳碰面站点，并输出每个人到达该站的用时。
+    :param graph: 图对象
+    :param station_index_map: 站点名称到索引的映射
+    :param start_stations: 各人出发站名称列表
+    :param mode: 'minimax' 或 'minisum'，见 meeting_station
+    """
+    origins = []
+    for name in start_stations:
+        idx = station_index_map.get(name)
+        if idx is None:
+            print(f"输入的站点 {name} 不存在。")
+            return
+        origins.append(idx)
+
+    result = meeting_station(StateGraph(graph), origins, mode)
+    if result is None:
+        print("找不到所有人都能到达的碰面站点。")
+        return
+
+    best, times = result
+    station_names = list(station_index_map.keys())
+    print(f"\n最佳碰面站点：{station_names[best]}")
+    for name, t in zip(start_stations, times):
+        print(f"{name} 出发：{int(t / 60)} 分钟")
+
+
+def benchmark(json_file='stations.json', origins=5, minutes=30, seed=0):
+    """
+    比较有界单源搜索与逐个调用点对点查询的耗时，并打印结果。
+    :param json_file: 站点数据文件
+    :param origins: 测试的起点数量（也是碰面查询的人数）
+    :param minutes: 等时圈时间上限（分钟）
+    :param seed: 随机种子
+    """
+    import random
+    import json_loader
+    import graph_builder
+    import fast_path
+
+    stations = json_loader.json_to_stations(json_file)
+    graph, _ = graph_builder.stations_to_graph(stations)
+    sg = StateGraph(graph)
+    n = graph.vertex_num()
+    rng = random.Random(seed)
+    starts = rng.sample(range(n), origins)
+
+    t0 = time.perf_counter()
+    for origin in starts:
+        reachable_stations(sg, origin, minutes)
+    bounded = (time.perf_counter() - t0) / origins * 1000
+
+    t0 = time.perf_counter()
+    for origin in starts:
+        sg.station_arrivals(origin, dwell=STOP_TIME)
+    full = (time.perf_counter() - t0) / origins * 1000
+
+    # 点对点查询：每个起点对所有站点调用一次 dijkstra_top_k_paths(k=1)
+    sample = starts[:1]
+    t0 = time.perf_counter()
+    for origin in sample:
+        for end in range(n):
+            if end != origin:
+                fast_path.dijkstra_top_k_paths(graph, origin, end, k=1)
+    looped = (time.perf_counter() - t0) / len(sample) * 1000
+
+    print(f"单个起点：{minutes} 分钟等时圈 {bounded:.2f} 毫秒，完整单源搜索 {full:.2f} 毫秒，"
+          f"逐站点对点查询 {looped:.0f} 毫秒")
+
+    for mode in ('minimax', 'minisum'):
+        t0 = time.perf_counter()
+        meeting_station(sg, starts, mode)
+        elapsed = (time.perf_counter() - t0) * 1000
+        print(f"{origins} 人碰面（{mode}，{'NumPy' if np is not None else '纯 Python'}）：{elapsed:.2f} 毫秒")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,239 @@
+#state_graph.py
+
+
+import heapq
+from array import array
+
+import instrumentation
+
+
+TRANSFER_TIME = 300  # 换乘时间300秒，与 fast_path / convenient_path 保持一致
+STOP_TIME = 60  # 每站停车时间60秒，显示的总时间按每段乘车加一次计算
+
+
+class StateGraph:
+    def __init__(self, graph, include_inactive=False):
+        """
+        根据 GraphAL 构建线路感知的状态图。
+        每个状态是 (站点索引, 线路ID) 二元组：同一线路上相邻站点之间是乘车边，
+        同一站点不同线路之间是换乘边（耗时 TRANSFER_TIME，计一次换乘）。
+        :param graph: 图对象
+        :param include_inactive: 是否收录未激活的边，默认只收录激活状态的边
+        """
+        self.station_num = graph.vertex_num()
+        self.states = []  # 状态索引 -> (站点索引, 线路ID)
+        self.state_index = {}  # (站点索引, 线路ID) -> 状态索引
+        self.station_states = [[] for _ in range(self.station_num)]  # 站点索引 -> 该站所有状态
+
+        # 先收集每条激活边两端的 (站点, 线路) 状态
+        ride_edges = []
+        for vi in range(self.station_num):
+            for vj, time, distance, line_id, is_active in graph.out_edges(vi):
+                if not is_active and not include_inactive:
+                    continue
+                ride_edges.append((self._state(vi, line_id), self._state(vj, line_id), time, distance))
+
+        # 邻接表元素格式为 (目标状态, 时间, 距离, 换乘次数)
+        self.adj = [[] for _ in self.states]
+        self.radj = [[] for _ in self.states]
+        for su, sv, time, distance in ride_edges:
+            self._add_arc(su, sv, time, distance, 0)
+
+        # 同站不同线路之间两两添加换乘边
+        for states in self.station_states:
+            for su in states:
+                for sv in states:
+                    if su != sv:
+                        self._add_arc(su, sv, TRANSFER_TIME, 0, 1)
+
+    def _state(self, station, line_id):
+        """
+        获取 (站点, 线路) 对应的状态索引，不存在时创建。
+        :param station: 站点索引
+        :param line_id: 线路ID
+        :return: 状态索引
+        """
+        key = (station, line_id)
+        s = self.state_index.get(key)
+        if s is None:
+            s = len(self.states)
+            self.states.append(key)
+            self.state_index[key] = s
+            self.station_states[station].append(s)
+        return s
+
+    def _add_arc(self, su, sv, time, distance, transfers):
+        """
+        在正向和反向邻接表中同时添加一条状态边。
+        """
+        self.adj[su].append((sv, time, distance, transfers))
+        self.radj[sv].append((su, time, distance, transfers))
+
+    def state_num(self):
+        """
+        获取状态图中状态的数量。
+        :return: 状态数量
+        """
+        return len(self.states)
+
+    def states_path_to_stations(self, state_path):
+        """
+        将状态路径还原为站点路径，合并同站换乘产生的重复站点。
+        :param state_path: 状态索引列表
+        :return: 站点索引列表
+        """
+        path = []
+        for s in state_path:
+            station = self.states[s][0]
+            if not path or path[-1] != station:
+                path.append(station)
+        return path
+
+    def arc(self, su, sv):
+        """
+        获取两个状态之间的边信息。
+        :param su: 起点状态
+        :param sv: 终点状态
+        :return: (目标状态, 时间, 距离, 换乘次数)，不存在时返回 None
+        """
+        for arc in self.adj[su]:
+            if arc[0] == sv:
+                return arc
+        return None
+
+    def path_result(self, state_path):
+        """
+        将状态路径转换为与 dijkstra_top_k_paths 相同格式的结果。
+        :param state_path: 状态索引列表
+        :return: (站点路径, 总时间, 总距离, 换乘次数)
+        """
+        total_time = 0
+        total_distance = 0
+        transfer_count = 0
+        for su, sv in zip(state_path, state_path[1:]):
+            _, time, distance, transfers = self.arc(su, sv)
+            total_time += time
+            total_distance += distance
+            transfer_count += transfers
+        return self.states_path_to_stations(state_path), total_time, total_distance, transfer_count
+
+    def shortest_path_tree(self, origin, active=None, reverse=False):
+        """
+        从起点站出发在状态图上运行单源 Dijkstra，得到最短时间树。
+        :param origin: 起始站点索引；reverse 为 True 时为终点站点索引
+        :param active: 状态是否可用的列表，默认全部可用
+        :param reverse: 是否在反向图上搜索，得到各状态到终点站的最短时间树
+        :return: (dist, parent)，分别为各状态的最短时间和树上的父状态（根状态及不可达状态为 None）；
+                 反向搜索时父状态是通往终点的下一个状态
+        """
+        n = len(self.states)
+        dist = [float('inf')] * n
+        parent = [None] * n
+        pq = []
+        for s in self.station_states[origin]:
+            if active is None or active[s]:
+                dist[s] = 0
+                pq.append((0, s))
+        adj = self.radj if reverse else self.adj
+        heap_pop = settled = 0  # 入堆次数在结束时由 出堆次数 + 剩余队列长度 得出
+        while pq:
+            c, x = heapq.heappop(pq)
+            heap_pop += 1
+            if c > dist[x]:
+                continue
+            settled += 1
+            for y, time, _, _ in adj[x]:
+                if active is not None and not active[y]:
+                    continue
+                nc = c + time
+                if nc < dist[y]:
+                    dist[y] = nc
+                    parent[y] = x
+                    heapq.heappush(pq, (nc, y))
+        if instrumentation.enabled:
+            instrumentation.record('shortest_path_tree', heap_push=heap_pop + len(pq), heap_pop=heap_pop,
+                                   settled=settled)
+        return dist, parent
+
+    def tree_path(self, dist, parent, end, reverse=False):
+        """
+        从最短时间树中取出到终点站的最优路径。
+        :param dist: shortest_path_tree 返回的最短时间列表
+        :param parent: shortest_path_tree 返回的父状态列表
+        :param end: 终点站点索引；reverse 为 True 时为起点站点索引
+        :param reverse: 最短时间树是否由反向搜索得到
+        :return: (站点路径, 总时间, 总距离, 换乘次数)，不可达时返回 None
+        """
+        best = min(self.station_states[end], key=lambda s: dist[s], default=None)
+        if best is None or dist[best] == float('inf'):
+            return None
+        state_path = []
+        while best is not None:
+            state_path.append(best)
+            best = parent[best]
+        if not reverse:
+            state_path.reverse()
+        return self.path_result(state_path)
+
+    def station_arrivals(self, origin, active=None, blocked=None, max_time=float('inf'), dwell=0):
+        """
+        有界单源搜索：计算从起点站到各站点的最短时间及该路径上的换乘次数，
+        时间相同时取换乘更少的路径，超过 max_time 后停止扩展。
+        :param origin: 起始站点索引
+        :param active: 状态是否可用的列表，默认全部可用
+        :param blocked: 被封闭的状态边集合，元素为 (起点状态, 终点状态)
+        :param max_time: 时间上限（秒）
+        :param dwell: 每段乘车的停车时间（秒）。路径仍按乘车与换乘时间选择，返回的时间再加上
+                      路径上每段乘车的停车时间，max_time 也按加上后的时间判断；
+                      传入 STOP_TIME 时与路线查询显示的总时间一致
+        :return: (times, transfers)，长度为站点数量的 array；不可达站点时间为 inf，换乘次数为 -1
+        """
+        inf = float('inf')
+        times = array('d', [inf]) * self.station_num
+        transfers = array('h', [-1]) * self.station_num
+        done = bytearray(self.station_num)
+        dist = {}
+        xfer = {}
+        hops = {}  # 乘车段数，只在 dwell 不为 0 时记录
+        pq = []
+        for s in self.station_states[origin]:
+            if active is None or active[s]:
+                dist[s] = 0
+                xfer[s] = 0
+                hops[s] = 0
+                pq.append((0, 0, s))
+        states = self.states
+        adj = self.adj
+        heap_pop = settled = 0
+        while pq:
+            c, k, x = heapq.heappop(pq)
+            heap_pop += 1
+            if c > max_time:
+                break
+            if (c, k) > (dist[x], xfer[x]):
+                continue
+            settled += 1
+            station = states[x][0]
+            if not done[station]:
+                done[station] = 1
+                arrive = c + dwell * hops[x] if dwell else c
+                if arrive <= max_time:
+                    times[station] = arrive
+                    transfers[station] = k
+            for y, t, _, tk in adj[x]:
+                if active is not None and not active[y]:
+                    continue
+                if blocked and (x, y) in blocked:
+                    continue
+                nc = c + t
+                nk = k + tk
+                if nc <= max_time and (nc, nk) < (dist.get(y, inf), xfer.get(y, inf)):
+                    dist[y] = nc
+                    xfer[y] = nk
+                    if dwell:
+                        hops[y] = hops[x] + 1 - tk
+                    heapq.heappush(pq, (nc, nk, y))
+        if instrumentation.enabled:
+            instrumentation.record('station_arrivals', heap_push=heap_pop + len(pq), heap_pop=heap_pop,
+                                   settled=settled)
+        return times, transfers
@@ -0,0 +1,56 @@
+#synthetic_network.py
+
+
+import random
+
+from json_loader import Station, StationEdge
+
+
+def scale_stations(stations, copies, links_per_copy=3, seed=0):
+    """
+    复制现有站点数据生成更大规模的合成网络，用于性能测试。
+    第 0 份保留原始站点和线路名称，其余各份在名称后加 "#编号" 后缀；
+    相邻两份之间随机选取若干站点，用双向城际线连接。
+    :param stations: json_to_stations 返回的站点字典
+    :param copies: 复制份数（网络规模倍数）
+    :param links_per_copy: 相邻两份之间的城际线数量
+    :param seed: 随机种子，保证生成结果可复现
+    :return: 新的站点字典，格式与 json_to_stations 相同
+    """
+    rng = random.Random(seed)
+    names = list(stations.keys())
+    result = {}
+
+    for c in range(copies):
+        for name, station in stations.items():
+            edges = [
+                StationEdge(_rename(edge.station, c), _rename(edge.line_id, c),
+                            edge.distance, edge.speed, edge.time)
+                for edge in station.edges
+            ]
+            lines = [_rename(line, c) for line in station.lines]
+            result[_rename(name, c)] = Station(_rename(name, c), edges, lines, len(lines))
+
+    # 相邻两份之间添加城际线
+    for c in range(copies - 1):
+        for k in range(links_per_copy):
+            a = _rename(rng.choice(names), c)
+            b = _rename(rng.choice(names), c + 1)
+            line_id = f"城际线{c}-{c + 1}-{k}"
+            distance = rng.randint(30000, 80000)  # 城际线距离（米）
+            speed = 40  # 城际线速度（米/秒）
+            time = distance / speed
+            for u, v in ((a, b), (b, a)):
+                station = result[u]
+                station.edges.append(StationEdge(v, line_id, distance, speed, time))
+                station.lines.append(line_id)
+                station.line_siz = len(station.lines)
+
+    return result
+
+
+def _rename(name, copy):
+    """
+    为第 copy 份网络中的站点或线路名称添加后缀。
+    """
+    return name if copy == 0 else f"{name}#{copy}"